@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends
-from app.api.routes import auth, schools, user
-from app.core.deps import get_current_session
+from app.api.routes import auth, health, heartbeats, metrics, schools, user
+from app.core.deps import get_current_session, heartbeat_key
 
 
 api_router = APIRouter()
 api_router.include_router(schools.router, prefix="/schools", dependencies=[Depends(get_current_session)], tags=["schools"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(user.router, prefix="/users", tags=["user"])
+api_router.include_router(heartbeats.router, prefix="/heartbeats", dependencies=[Depends(heartbeat_key)], tags=["heartbeats"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(health.router, prefix="/health", tags=["health"])
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.core.deps import get_current_user
-from app.core.exceptions import InvalidCredentials
+from app.core.deps import admin_only, get_current_user
+from app.core.exceptions import InvalidCredentials, PasswordHashingBusy
+from app.core.security import password_hashing_stats
 from app.schemas.auth import UserLoginUsername
 from app.schemas.user import UserOut, UserUpdatePassword
 from app.services.auth import login as login_svc, logout as logout_svc, update_user_password as update_user_password_svc
@@ -10,10 +11,17 @@ from app.core.config import settings
 
 router = APIRouter()
 
+HASHING_BUSY = HTTPException(
+    status.HTTP_503_SERVICE_UNAVAILABLE, "Too many logins in progress, try again shortly.", headers={"Retry-After": "1"}
+)
+
 
 @router.post("/login")
 async def login(user_data: UserLoginUsername, response: Response):
-    result = await login_svc(user_data.username, user_data.password)
+    try:
+        result = await login_svc(user_data.username, user_data.password)
+    except PasswordHashingBusy:
+        raise HASHING_BUSY
 
     if not result:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
@@ -51,3 +59,9 @@ async def update_password(password_data: UserUpdatePassword, current_user: UserO
         await update_user_password_svc(current_user.id, password_data.old_password, password_data.new_password)
     except InvalidCredentials:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
+    except PasswordHashingBusy:
+        raise HASHING_BUSY
+
+@router.get("/password-hashing", dependencies=[Depends(admin_only)])
+async def get_password_hashing_stats():
+    return password_hashing_stats()
@@ -0,0 +1,46 @@
+import asyncio
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import mongo_pool_monitor
+from app.db.mongodb import db, ping_mongo, warm_up_mongo
+from app.services.search_index import school_search_index
+
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def readiness():
+    """Ready once the Mongo pool is warmed up and the primary answers a ping in time."""
+    ping_ms = None
+    error = None
+    try:
+        ping_ms = round(await ping_mongo(), 2)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+
+    if error is None and not db.warmed_up:
+        # Startup warm-up failed; retry it now that Mongo answers.
+        try:
+            await asyncio.wait_for(warm_up_mongo(), settings.MONGO_READY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    ready = db.warmed_up and error is None
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "mongo": {
+            "warmed_up": db.warmed_up,
+            "ping_ms": ping_ms,
+            "error": error,
+            "read_preference": db.reads_read_preference.mongos_mode,
+            "pool": mongo_pool_monitor.totals(),
+            "pools": {address: pool.as_dict() for address, pool in mongo_pool_monitor.pools.items()},
+        },
+        "index_drift": db.index_drift,
+        "search_index_ready": school_search_index.ready,
+    }
+    return JSONResponse(body, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
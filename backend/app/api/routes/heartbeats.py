@@ -0,0 +1,13 @@
+from fastapi import APIRouter, status
+
+from app.schemas.school import HeartbeatIn
+from app.services.heartbeats import heartbeat_buffer
+
+
+router = APIRouter()
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_heartbeat(heartbeat: HeartbeatIn):
+    heartbeat_buffer.add(heartbeat)
+    return {"detail": "accepted"}
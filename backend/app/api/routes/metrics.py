@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core.deps import admin_only
+from app.core.metrics import mongo_pool_monitor, render_metrics
+from app.core.security import password_hashing_stats
+from app.core.session_cache import principal_cache
+from app.services.activity_logs import access_log_buffer, qr_scan_buffer
+from app.services.heartbeats import heartbeat_buffer
+from app.services.school_events import school_event_broker
+from app.services.snapshot_cache import school_snapshots
+from app.services.search_index import school_search_index
+
+
+router = APIRouter()
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", dependencies=[Depends(admin_only)], response_class=PlainTextResponse)
+async def get_metrics():
+    hashing = password_hashing_stats()
+    pool = mongo_pool_monitor.totals()
+    gauges = {
+        "password_hash_in_flight": ("bcrypt hashes running in the worker pool.", hashing["in_flight"]),
+        "password_hash_queued": ("bcrypt hashes waiting for a worker.", hashing["queued"]),
+        "mongo_pool_connections_open": ("Pooled MongoDB connections, all servers.", pool["open"]),
+        "mongo_pool_connections_checked_out": ("MongoDB connections in use.", pool["checked_out"]),
+        "mongo_pool_checkouts_waiting": ("Operations waiting for a MongoDB connection.", pool["waiting"]),
+        "heartbeat_buffer_pending": ("Devices with a heartbeat waiting to be flushed.", len(heartbeat_buffer)),
+        "qr_scan_buffer_pending": ("QR scans waiting to be flushed.", len(qr_scan_buffer)),
+        "access_log_buffer_pending": ("Access log entries waiting to be flushed.", len(access_log_buffer)),
+        "school_event_subscribers": ("Open /schools/events streams.", len(school_event_broker)),
+        "school_search_index_size": ("Schools in the in-memory search index.", len(school_search_index)),
+        "session_cache_entries": ("Sessions in the principal cache.", len(principal_cache)),
+        "school_snapshot_cache_entries": ("Cached GET /schools bodies.", len(school_snapshots)),
+        "school_snapshot_cache_bytes": ("Bytes held by cached GET /schools bodies, all encodings.", school_snapshots.bytes),
+    }
+    # Only ever increase while the process lives, so rate() handles restarts.
+    counters = {
+        "mongo_pool_checkout_timeouts_total": ("Connection checkouts that hit MONGO_WAIT_QUEUE_TIMEOUT_MS.", mongo_pool_monitor.checkout_timeouts),
+        "heartbeats_dropped_total": ("Heartbeats dropped because their buffer was full.", heartbeat_buffer.dropped),
+        "activity_entries_dropped_total": ("QR scans and access logs dropped because their buffer was full.", qr_scan_buffer.dropped + access_log_buffer.dropped),
+        "school_snapshot_cache_hits_total": ("GET /schools responses served from the snapshot cache.", school_snapshots.hits),
+        "school_snapshot_cache_misses_total": ("GET /schools responses that had to be built.", school_snapshots.misses),
+    }
+    return PlainTextResponse(render_metrics(gauges, counters), media_type=PROMETHEUS_MEDIA_TYPE)
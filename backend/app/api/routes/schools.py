@@ -1,56 +1,441 @@
-from datetime import datetime, timezone
-from typing import Dict, List
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Literal
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from app.core.deps import admin_and_staff
+from app.core.config import settings
+from app.core.deps import admin_and_staff, admin_only, get_current_principal
+from app.core.exceptions import InvalidCursor, InvalidFields, LoomaIdExists, PreconditionFailed
+from app.core.session_cache import Principal
+from app.models.access_log import AccessLogDoc
+from app.models.qr_scan import QRScanDoc
 from app.models.school import School
-from app.schemas.school import SchoolCreate, SchoolOut, SchoolUpdate, SchoolUpdateStatus
+from app.schemas.activity import AccessLogIn, QRScanIn
+from app.schemas.school import (
+    SchoolBulkDelete,
+    SchoolBulkResult,
+    SchoolBulkUpdate,
+    SchoolClusters,
+    SchoolCreate,
+    SchoolImportFormat,
+    SchoolImportResult,
+    SchoolOut,
+    SchoolSort,
+    SchoolUpdate,
+    SchoolUpdateStatus,
+    SchoolUptime,
+)
+from app.services.activity_logs import activity_out, list_activity, qr_scan_buffer, record_access
+from app.services.school_bulk import bulk_delete_schools, bulk_update_schools
+from app.services.school_geo import school_clusters, schools_near, schools_within
+from app.services.school_events import school_event_broker
+from app.services.school_rollups import get_school_rollups, rollup_level
+from app.services.school_uptime import school_uptime
+from app.services.school_import import import_schools, iter_csv_rows, iter_lines, iter_ndjson_rows
+from app.services.school_serialization import SCHOOL_DETAIL_FIELDS, SCHOOL_FIELDS, SchoolFieldSet, dump_json, json_response, parse_school_fields
+from app.services.snapshot_cache import school_snapshots, snapshot_response
+from app.services.school_version import get_school_activity_version, get_school_version
 from app.services.schools import (
     add_school,
     delete_school_by_id,
     get_school_stats,
-    get_schoool_by_id,
+    get_school_looma_id,
+    get_school_out,
+    get_schools_by_ids,
+    iter_schools,
     list_schools,
+    list_schools_page,
+    search_index_generation,
     update_school,
     update_school_status,
 )
+from app.utils.etag import etag_matches, if_match_revisions, make_etag, matching_etag, revision_etag
 
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag))
+
+
+def _set_etag(response: Response, etag: str):
+    response.headers.update(_etag_headers(etag))
+
+
+REVISION_CHANGED = HTTPException(
+    status.HTTP_412_PRECONDITION_FAILED, "School was changed since that revision; reload it and retry."
+)
+LOOMA_ID_EXISTS = HTTPException(status.HTTP_400_BAD_REQUEST, "School with that loomaId already exists")
+
+
+def _log_access(request: Request, principal: Principal, school_id: PydanticObjectId, action: str, details: str | None = None) -> Dict[str, Any]:
+    # Buffered: the entry is written by the activity flusher, not this request.
+    ip_address = request.client.host if request.client else None
+    return record_access(school_id, principal.user_id, principal.username, action, details, ip_address)
+
+
+async def _activity_page(
+    document, owner: Dict[str, Any], since: datetime | None, until: datetime | None, limit: int, cursor: str | None
+) -> Dict[str, Any]:
+    try:
+        return await list_activity(document, owner, since=since, until=until, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+
+
+def _check_bbox(min_lng: float | None, min_lat: float | None, max_lng: float | None, max_lat: float | None):
+    bounds = (min_lng, min_lat, max_lng, max_lat)
+    if None in bounds:
+        if any(bound is not None for bound in bounds):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Give all of min_lng, min_lat, max_lng and max_lat, or none")
+        return
+    if min_lng >= max_lng or min_lat >= max_lat:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "min_lng and min_lat must be below max_lng and max_lat")
+
+
+def _uptime_range(start: date, end: date | None) -> date:
+    end = end if end is not None else datetime.now(timezone.utc).date()
+    if end < start:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "to must not be before from")
+    if (end - start).days >= settings.SCHOOL_UPTIME_MAX_RANGE_DAYS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Ranges are limited to {settings.SCHOOL_UPTIME_MAX_RANGE_DAYS} days")
+    return end
+
+
+def _field_set(fields: str | None, default: SchoolFieldSet = SCHOOL_FIELDS) -> SchoolFieldSet:
+    try:
+        return parse_school_fields(fields, default)
+    except InvalidFields as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown field or preset in fields: {e}")
+
+
+async def _ndjson_lines(search: str | None, province: str | None, field_set: SchoolFieldSet):
+    async for school in iter_schools(search=search, province=province, fields=field_set):
+        yield dump_json(school) + b"\n"
+
 
 @router.get("")
 async def get_schools(
-    stats: bool = False, province: str | None = None, search: str | None = None
+    request: Request,
+    stats: bool = False,
+    province: str | None = None,
+    search: str | None = None,
+    limit: int | None = Query(None, ge=1, le=settings.SCHOOLS_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+    sort: SchoolSort = SchoolSort.NAME,
+    include_total: bool = False,
+    stream: bool = False,
+    activity: bool = False,
+    fields: str | None = None,
+):
+    field_set = _field_set(fields)
+    # Stats are one small object, so they never stream.
+    if not stats and (stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")):
+        return StreamingResponse(_ndjson_lines(search, province, field_set), media_type=NDJSON_MEDIA_TYPE)
+
+    # Read the version before the data: a write racing with this request
+    # then yields a stale ETag (forcing a refetch), never a stale body.
+    # Searches also carry the index generation: this worker's index may not
+    # have caught up with the version yet, and its refresh must change the tag.
+    # Lists only read the activity collections for counts; the entry lists are always empty.
+    activity_version = await get_school_activity_version() if activity or field_set.counts else None
+    etag = make_etag(
+        await get_school_version(),
+        activity_version,
+        search_index_generation(search),
+        "list",
+        sorted(request.query_params.multi_items()),
+    )
+    matched = matching_etag(request, etag)
+    if matched is not None:
+        return _not_modified(matched)
+    headers = _etag_headers(etag)
+
+    async def build() -> Dict[str, Any]:
+        if stats:
+            return await get_school_stats()
+
+        if limit is None and cursor is None:
+            school_list = await list_schools(search=search, province=province, activity=activity, fields=field_set)
+            return {"schools": school_list, "total": len(school_list)}
+
+        try:
+            return await list_schools_page(
+                search=search,
+                province=province,
+                limit=limit or settings.SCHOOLS_PAGE_DEFAULT_LIMIT,
+                cursor=cursor,
+                sort=sort,
+                include_total=include_total,
+                activity=activity,
+                fields=field_set,
+            )
+        except InvalidCursor:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+
+    if not school_snapshots.enabled:
+        return json_response(await build(), headers)
+    # Every tab refreshing at once shares one query and one encoding; hits
+    # touch neither Mongo nor the JSON encoder.
+    return snapshot_response(request, await school_snapshots.get(etag, build), headers)
+
+
+@router.get("/batch")
+async def get_school_batch(
+    ids: List[PydanticObjectId] = Query(..., max_length=settings.SCHOOLS_BATCH_MAX_IDS),
+    fields: str | None = None,
 ):
-    if stats:
-        return await get_school_stats()
-    school_list = await list_schools(search=search, province=province)
-    return {"schools": school_list, "total": len(school_list)}
+    school_list = await get_schools_by_ids(ids, _field_set(fields))
+    return json_response({"schools": school_list, "total": len(school_list)})
+
+
+@router.patch("/bulk", response_model=SchoolBulkResult)
+async def bulk_update(data: SchoolBulkUpdate, request: Request, access: Principal = Depends(admin_and_staff)):
+    result, school_ids = await bulk_update_schools(data.filter, data.patch, data.dry_run)
+    details = "bulk: " + ", ".join(sorted(data.patch.model_dump(exclude_unset=True)))
+    for school_id in school_ids:
+        _log_access(request, access, school_id, "update", details)
+    return result
+
+
+@router.post("/bulk/delete", response_model=SchoolBulkResult)
+async def bulk_delete(data: SchoolBulkDelete, request: Request, access: Principal = Depends(admin_only)):
+    result, school_ids = await bulk_delete_schools(data.filter, data.dry_run)
+    for school_id in school_ids:
+        _log_access(request, access, school_id, "delete", "bulk")
+    return result
+
+
+@router.get("/events")
+async def school_events(request: Request, access=Depends(get_current_principal)):
+    if len(school_event_broker) >= settings.SCHOOL_EVENTS_MAX_SUBSCRIBERS:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Too many live connections.", headers={"Retry-After": "30"})
+
+    subscriber = school_event_broker.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next_batch(settings.SCHOOL_EVENTS_KEEPALIVE_SECONDS)
+                if subscriber.dropped:
+                    # Too far behind to patch incrementally; the client refetches.
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: schools\ndata: {to_json(batch, fallback=str).decode()}\n\n"
+        finally:
+            school_event_broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/rollups")
+async def get_rollups(
+    request: Request,
+    response: Response,
+    province: str | None = None,
+    district: str | None = None,
+):
+    if district is not None and province is None:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "district requires province")
+
+    etag = make_etag(await get_school_version(), "rollups", province, district)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+
+    nodes = await get_school_rollups(province, district)
+    return {"level": rollup_level(province, district), "nodes": nodes}
+
+
+@router.get("/uptime", response_model=SchoolUptime)
+async def get_uptime(
+    start: date = Query(..., alias="from"),
+    end: date | None = Query(None, alias="to", description="inclusive; defaults to today (UTC)"),
+    granularity: Literal["day", "week"] = "day",
+    province: str | None = None,
+):
+    end = _uptime_range(start, end)
+    return await school_uptime(start, end, granularity, province=province)
+
+
+@router.get("/geo/within")
+async def get_schools_within(
+    min_lng: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    limit: int = Query(settings.SCHOOLS_PAGE_MAX_LIMIT, ge=1, le=settings.SCHOOLS_PAGE_MAX_LIMIT),
+    fields: str | None = None,
+):
+    _check_bbox(min_lng, min_lat, max_lng, max_lat)
+    school_list = await schools_within(min_lng, min_lat, max_lng, max_lat, limit, _field_set(fields))
+    return json_response({"schools": school_list, "total": len(school_list)})
+
+
+@router.get("/geo/near")
+async def get_schools_near(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    max_distance_m: float | None = Query(None, gt=0),
+    limit: int = Query(settings.SCHOOLS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.SCHOOLS_PAGE_MAX_LIMIT),
+    fields: str | None = None,
+):
+    school_list = await schools_near(lng, lat, max_distance_m, limit, _field_set(fields))
+    return json_response({"schools": school_list, "total": len(school_list)})
+
+
+@router.get("/geo/clusters", response_model=SchoolClusters)
+async def get_school_clusters(
+    request: Request,
+    response: Response,
+    zoom: int = Query(..., ge=0, le=22),
+    min_lng: float | None = Query(None, ge=-180, le=180),
+    min_lat: float | None = Query(None, ge=-90, le=90),
+    max_lng: float | None = Query(None, ge=-180, le=180),
+    max_lat: float | None = Query(None, ge=-90, le=90),
+):
+    _check_bbox(min_lng, min_lat, max_lng, max_lat)
+    etag = make_etag(await get_school_version(), "clusters", sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+    return await school_clusters(zoom, min_lng, min_lat, max_lng, max_lat)
 
 
 @router.get("/{id}", response_model=SchoolOut)
-async def get_school(id: PydanticObjectId):
-    school = await get_schoool_by_id(id)
-    if school is None:
+async def get_school(id: PydanticObjectId, request: Request, fields: str | None = None):
+    field_set = _field_set(fields, SCHOOL_DETAIL_FIELDS)
+    activity_version = await get_school_activity_version() if field_set.activity else None
+    etag = make_etag(await get_school_version(), activity_version, "school", str(id), field_set.projection, field_set.activity)
+    matched = matching_etag(request, etag, exists=False)
+    if matched is not None:
+        return _not_modified(matched)
+
+    found = await get_school_out(id, field_set)
+    if found is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"School with id {id} not found",
         )
-    return school
+    school, revision = found
+    etag = revision_etag(revision, etag)
+    # `If-None-Match: *` can only be answered now that the school is known to exist.
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    return json_response(school, _etag_headers(etag))
+
+
+@router.get("/{id}/uptime", response_model=SchoolUptime)
+async def get_school_uptime(
+    id: PydanticObjectId,
+    start: date = Query(..., alias="from"),
+    end: date | None = Query(None, alias="to", description="inclusive; defaults to today (UTC)"),
+    granularity: Literal["day", "week"] = "day",
+):
+    end = _uptime_range(start, end)
+    return await school_uptime(start, end, granularity, school_id=id)
+
+
+@router.get("/{id}/qr-scans", dependencies=[Depends(admin_and_staff)])
+async def get_qr_scans(
+    id: PydanticObjectId,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(settings.ACTIVITY_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ACTIVITY_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+):
+    page = await _activity_page(QRScanDoc, {"schoolId": id}, since, until, limit, cursor)
+    return json_response({"scans": page["items"], "next_cursor": page["next_cursor"]})
+
+
+@router.post("/{id}/qr-scans", status_code=status.HTTP_202_ACCEPTED)
+async def create_qr_scan(id: PydanticObjectId, data: QRScanIn, access: Principal = Depends(admin_and_staff)):
+    looma_id = data.loomaId
+    if looma_id is None:
+        looma_id = await get_school_looma_id(id)
+        if looma_id is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"School with id {id} not found")
+
+    scan = qr_scan_buffer.add({
+        "schoolId": id,
+        "timestamp": data.timestamp,
+        "loomaId": looma_id,
+        "staffName": data.staffName or access.username,
+        "userId": access.user_id,
+        "notes": data.notes,
+    })
+    return json_response({"scan": activity_out(scan)}, status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.get("/{id}/access-logs", dependencies=[Depends(admin_and_staff)])
+async def get_access_logs(
+    id: PydanticObjectId,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(settings.ACTIVITY_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ACTIVITY_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+):
+    page = await _activity_page(AccessLogDoc, {"schoolId": id}, since, until, limit, cursor)
+    return json_response({"logs": page["items"], "next_cursor": page["next_cursor"]})
+
+
+@router.post("/{id}/access-logs", status_code=status.HTTP_202_ACCEPTED)
+async def create_access_log(id: PydanticObjectId, data: AccessLogIn, request: Request, access: Principal = Depends(admin_and_staff)):
+    log = _log_access(request, access, id, data.action, data.details)
+    return json_response({"log": activity_out(log)}, status_code=status.HTTP_202_ACCEPTED)
 
 
 @router.post("")
-async def create_school(data: SchoolCreate, access=Depends(admin_and_staff)):
-    created_school = await add_school(data)
+async def create_school(data: SchoolCreate, request: Request, access: Principal = Depends(admin_and_staff)):
+    try:
+        created_school = await add_school(data)
+    except LoomaIdExists:
+        raise LOOMA_ID_EXISTS
+    _log_access(request, access, created_school.id, "create")
     return created_school
 
 
+@router.post("/import", response_model=SchoolImportResult)
+async def import_school_rows(
+    request: Request,
+    format: SchoolImportFormat | None = None,
+    batch_size: int = Query(settings.SCHOOL_IMPORT_BATCH_SIZE, ge=1, le=settings.SCHOOL_IMPORT_MAX_BATCH_SIZE),
+    access=Depends(admin_and_staff),
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = SchoolImportFormat.CSV if "csv" in content_type else SchoolImportFormat.NDJSON
+
+    lines = iter_lines(request.stream())
+    rows = iter_csv_rows(lines) if format == SchoolImportFormat.CSV else iter_ndjson_rows(lines)
+    return await import_schools(rows, batch_size)
+
+
 @router.delete("/{id}")
-async def delete_school(id: PydanticObjectId, access=Depends(admin_and_staff)):
-    await delete_school_by_id(id)
+async def delete_school(id: PydanticObjectId, request: Request, access: Principal = Depends(admin_and_staff)):
+    try:
+        await delete_school_by_id(id, if_match_revisions(request))
+    except PreconditionFailed:
+        raise REVISION_CHANGED
+    _log_access(request, access, id, "delete")
     return {"detail": "success"}
 
 
@@ -58,15 +443,26 @@ async def delete_school(id: PydanticObjectId, access=Depends(admin_and_staff)):
 async def update_status(
     id: PydanticObjectId,
     status_str: SchoolUpdateStatus,
-    access=Depends(admin_and_staff),
+    request: Request,
+    access: Principal = Depends(admin_and_staff),
 ):
-    school_to_update = await update_school_status(id, status_str.status)
+    try:
+        school_to_update = await update_school_status(id, status_str.status, if_match_revisions(request))
+    except PreconditionFailed:
+        raise REVISION_CHANGED
+    _log_access(request, access, id, "status", status_str.status.value)
     return school_to_update
 
 
 @router.put("/{id}")
 async def update(
-    id: PydanticObjectId, data: SchoolUpdate, access=Depends(admin_and_staff)
+    id: PydanticObjectId, data: SchoolUpdate, request: Request, access: Principal = Depends(admin_and_staff)
 ):
-    updated_school = await update_school(id, data)
+    try:
+        updated_school = await update_school(id, data, if_match_revisions(request))
+    except PreconditionFailed:
+        raise REVISION_CHANGED
+    except LoomaIdExists:
+        raise LOOMA_ID_EXISTS
+    _log_access(request, access, id, "update", ", ".join(sorted(data.model_dump(exclude_unset=True))))
     return updated_school
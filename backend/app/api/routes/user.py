@@ -1,7 +1,14 @@
+from datetime import datetime
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.deps import admin_only, get_current_user
-from app.core.exceptions import EmailExists, UserExists, UserNotFound
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.config import settings
+from app.core.deps import admin_only, get_current_principal, get_current_user
+from app.core.exceptions import EmailExists, InvalidCursor, PasswordHashingBusy, UserExists, UserNotFound
+from app.core.session_cache import Principal
+from app.models.access_log import AccessLogDoc
+from app.models.qr_scan import QRScanDoc
+from app.services.activity_logs import list_activity
+from app.services.school_serialization import json_response
 from app.services.user import add_user as add_user_svc, delete_user_by_id, edit_user as edit_user_svc, edit_user_me as edit_user_me_svc
 from app.schemas.user import UserAdd, UserEdit, UserEditMe, UserOut
 
@@ -16,6 +23,8 @@ async def add_user(user_data: UserAdd, access = Depends(admin_only)):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "User already exists")
     except EmailExists:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "User with that email already exists")
+    except PasswordHashingBusy:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Server busy, try again shortly.", headers={"Retry-After": "1"})
         
     return new_user
 
@@ -50,3 +59,40 @@ async def update_user(user_id: PydanticObjectId, user_data: UserEdit, access = D
     except UserNotFound:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
     return edited_user
+
+
+def _own_or_admin(user_id: PydanticObjectId, principal: Principal):
+    if principal.role != "admin" and principal.user_id != user_id:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin access required.")
+
+@router.get("/{user_id}/access-logs")
+async def get_user_access_logs(
+    user_id: PydanticObjectId,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(settings.ACTIVITY_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ACTIVITY_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+    principal: Principal = Depends(get_current_principal),
+):
+    _own_or_admin(user_id, principal)
+    try:
+        page = await list_activity(AccessLogDoc, {"userId": user_id}, since=since, until=until, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+    return json_response({"logs": page["items"], "next_cursor": page["next_cursor"]})
+
+@router.get("/{user_id}/qr-scans")
+async def get_user_qr_scans(
+    user_id: PydanticObjectId,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(settings.ACTIVITY_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ACTIVITY_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+    principal: Principal = Depends(get_current_principal),
+):
+    _own_or_admin(user_id, principal)
+    try:
+        page = await list_activity(QRScanDoc, {"userId": user_id}, since=since, until=until, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+    return json_response({"scans": page["items"], "next_cursor": page["next_cursor"]})
@@ -0,0 +1,28 @@
+"""Fill School.location from latitude/longitude for documents written before it existed.
+
+    python -m app.commands.backfill_school_locations
+"""
+import asyncio
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.models.school import School
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        result = await School.get_pymongo_collection().update_many(
+            {
+                "location": {"$exists": False},
+                "latitude": {"$gte": -90, "$lte": 90},
+                "longitude": {"$gte": -180, "$lte": 180},
+            },
+            [{"$set": {"location": {"type": "Point", "coordinates": ["$longitude", "$latitude"]}}}],
+        )
+        print(f"Backfilled location on {result.modified_count} school(s)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
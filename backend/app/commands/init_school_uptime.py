@@ -0,0 +1,24 @@
+"""Start uptime tracking for schools that have no open status interval yet.
+
+    python -m app.commands.init_school_uptime
+
+Run once after enabling SCHOOL_UPTIME_TRACKING on an existing database; each
+school's current status is counted from now on.
+"""
+import asyncio
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.services.school_uptime import seed_status_state
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        count = await seed_status_state()
+        print(f"Uptime tracking started for {count} school(s)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
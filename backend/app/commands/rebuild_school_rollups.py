@@ -0,0 +1,24 @@
+"""Rebuild the materialised province/district/palika rollups from the schools collection.
+
+    python -m app.commands.rebuild_school_rollups
+"""
+import asyncio
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.services.school_rollups import rebuild_school_rollups
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        count = await rebuild_school_rollups()
+        if count is None:
+            print("Another process is rebuilding the school rollups; try again later")
+        else:
+            print(f"School rollups rebuilt: {count} node(s)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
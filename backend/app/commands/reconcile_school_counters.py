@@ -0,0 +1,21 @@
+"""Rebuild the school status counters document from the schools collection.
+
+    python -m app.commands.reconcile_school_counters
+"""
+import asyncio
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.services.school_counters import reconcile_school_counters
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        stats = await reconcile_school_counters()
+        print(f"School counters reconciled: {stats}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
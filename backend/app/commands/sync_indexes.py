@@ -0,0 +1,23 @@
+"""Create declared indexes and print any drift from what is in the database.
+
+    python -m app.commands.sync_indexes
+"""
+import asyncio
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, db
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        for collection, problems in db.index_drift.items():
+            status = "ok" if not problems else f"{len(problems)} problem(s)"
+            print(f"{collection}: {status}")
+            for problem in problems:
+                print(f"  - {problem}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,14 +1,95 @@
-from typing import List
+from typing import List, Literal
 from fastapi import FastAPI
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     MONGODB_URI: str
     MONGODB_DB_NAME: str
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int | None = None # close pooled connections idle for longer
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int | None = None # fail a checkout instead of queueing forever
+    MONGO_COMPRESSORS: List[Literal["zstd", "zlib", "snappy"]] = [] # in order of preference; zstd needs `zstandard`
+    MONGO_ZLIB_COMPRESSION_LEVEL: int = -1
+    # read preference for the school list, search and stats reads (and the ETag
+    # version they are cached under); every other read and all writes use the primary
+    MONGO_READS_READ_PREFERENCE: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "primary"
+    MONGO_READS_MAX_STALENESS_SECONDS: int = -1 # -1 is unbounded; otherwise at least 90
+    MONGO_WARMUP_CONNECTIONS: int = 10 # opened per read target during startup, before serving
+    MONGO_READY_TIMEOUT_SECONDS: float = 2.0
     ALLOWED_ORIGINS: List[str] = ["*"]
     SESSION_EXPIRES_DAYS: int = 7
     COOKIE_SECURE: bool = False # set to true on production
     SESSION_COOKIE_NAME: str = "session_token"
+    SESSION_CACHE_TTL_SECONDS: int = 60 # 0 disables the principal cache
+    SESSION_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4 # 0 hashes on the event loop
+    PASSWORD_HASH_MAX_QUEUE: int = 64 # beyond this, hashing requests get a 503
+    # keep a counters document in sync on writes so stats are a single read;
+    # rebuild it with `python -m app.commands.reconcile_school_counters`
+    SCHOOL_STATS_COUNTERS: bool = False
+    # keep province/district/palika rollup documents in sync on writes;
+    # rebuild them with `python -m app.commands.rebuild_school_rollups`
+    SCHOOL_ROLLUPS_MATERIALISED: bool = False
+    SCHOOLS_PAGE_DEFAULT_LIMIT: int = 50
+    SCHOOLS_PAGE_MAX_LIMIT: int = 500
+    SCHOOLS_STREAM_BATCH_SIZE: int = 500
+    SCHOOLS_BATCH_MAX_IDS: int = 500 # ids per GET /schools/batch
+    # how long a worker trusts its cached schools version (ETags) before re-reading it
+    SCHOOL_VERSION_TTL_SECONDS: float = 1.0
+    # encoded, precompressed GET /schools bodies per worker, keyed by ETag; 0 disables
+    SCHOOL_SNAPSHOT_CACHE_MAX_BYTES: int = 64 * 2**20
+    SCHOOL_SNAPSHOT_GZIP_LEVEL: int = 6
+    SCHOOL_SNAPSHOT_BROTLI_QUALITY: int = 5 # used when `brotli` is installed
+    SCHOOL_IMPORT_BATCH_SIZE: int = 500
+    SCHOOL_IMPORT_MAX_BATCH_SIZE: int = 5000
+    SCHOOL_IMPORT_MAX_ERRORS: int = 1000 # per-row errors reported before truncating
+    # "change_stream" publishes writes from every worker (needs a replica set)
+    SCHOOL_EVENTS_SOURCE: Literal["local", "change_stream"] = "local"
+    SCHOOL_EVENTS_MAX_PENDING: int = 1000 # per client; beyond this the client is told to reload
+    SCHOOL_EVENTS_MAX_SUBSCRIBERS: int = 500
+    SCHOOL_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    GEO_CLUSTER_CELLS_PER_TILE: int = 8
+    GEO_MAX_CLUSTERS: int = 2000
+    HEARTBEAT_API_KEY: str | None = None # devices send it as X-Heartbeat-Key; unset disables ingestion
+    HEARTBEAT_FLUSH_INTERVAL_SECONDS: float = 5.0
+    HEARTBEAT_FLUSH_MAX_PENDING: int = 1000 # flush early once this many devices are buffered
+    HEARTBEAT_BUFFER_MAX_ENTRIES: int = 50000 # devices; beyond this heartbeats from new devices are dropped
+    # online schools without a heartbeat for this long are marked offline by one worker at a time
+    SCHOOL_OFFLINE_AFTER_SECONDS: int = 900
+    SCHOOL_OFFLINE_SWEEP_INTERVAL_SECONDS: int = 60 # 0 disables the sweeper
+    SCHOOL_OFFLINE_SWEEP_BATCH_SIZE: int = 1000
+    # append status transitions to status_transitions and keep per-school daily/weekly
+    # uptime rollups on writes; start tracking with `python -m app.commands.init_school_uptime`
+    SCHOOL_UPTIME_TRACKING: bool = True
+    SCHOOL_UPTIME_MAX_RANGE_DAYS: int = 366 # per GET /schools/uptime request
+    # in-process trigram index for ?search=; falls back to the text index until loaded
+    SCHOOL_SEARCH_INDEX: bool = True
+    SCHOOL_SEARCH_MIN_SIMILARITY: float = 0.5
+    SCHOOL_SEARCH_INDEX_REFRESH_SECONDS: int = 300 # 0 loads once at startup
+    # per-route latency and Mongo command metrics, served at GET /metrics (admin only)
+    METRICS_ENABLED: bool = True
+    MONGO_SLOW_QUERY_MS: int = 200 # log Mongo commands slower than this; 0 disables
+    # QR scans and access logs are buffered and written with one insert_many per flush
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 2.0
+    ACTIVITY_FLUSH_MAX_PENDING: int = 500 # flush early once this many entries are buffered
+    ACTIVITY_BUFFER_MAX_ENTRIES: int = 50000 # per buffer; beyond this new entries are dropped
+    ACTIVITY_RETENTION_DAYS: int | None = None # expire entries after this long; applies when the collection is created
+    ACTIVITY_PAGE_DEFAULT_LIMIT: int = 50
+    ACTIVITY_PAGE_MAX_LIMIT: int = 500
+    SCHOOL_ACTIVITY_RECENT_ENTRIES: int = 10 # latest scans and access logs embedded in GET /schools/{id}; 0 embeds none
+    SCHOOL_ACTIVITY_COUNT_DAYS: int = 30 # window for qrScanCount/accessLogCount; 0 counts everything
+
+    # `python -m app.serve`; MONGO_* pool sizes apply per worker unless SERVE_MONGO_POOL_BUDGET is set
+    SERVE_HOST: str = "0.0.0.0"
+    SERVE_PORT: int = 8000
+    SERVE_WORKERS: int = 0 # 0 starts one per CPU
+    SERVE_REUSE_PORT: bool = False
+    SERVE_MAX_REQUESTS: int = 0 # recycle workers after this many requests; 0 never
+    SERVE_MAX_REQUESTS_JITTER: int = 1000
+    SERVE_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVE_KEEPALIVE_SECONDS: int = 5
+    SERVE_MONGO_POOL_BUDGET: int | None = None # total connections, split evenly across workers
 
     model_config = SettingsConfigDict(env_file=".env")
 
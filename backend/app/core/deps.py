@@ -1,20 +1,42 @@
+import secrets
+
 from fastapi import HTTPException, Request, status
 
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.session_cache import Principal
 from app.schemas.user import UserOut
-from app.services.auth import get_user_from_session
+from app.services.auth import get_principal_from_session
+from app.services.user import get_user_by_id
 
 logger = get_logger(__name__)
 
-async def get_current_user(
-    request: Request,
-) -> UserOut:
+async def _resolve_principal(request: Request, session_token: str) -> Principal | None:
+    # Several deps can run for one request; resolve the token only once.
+    if hasattr(request.state, "principal"):
+        return request.state.principal
+
+    principal = await get_principal_from_session(session_token)
+    request.state.principal = principal
+    return principal
+
+async def get_current_principal(request: Request) -> Principal:
     session_token = request.cookies.get(settings.SESSION_COOKIE_NAME)
     if not session_token:
         logger.error("Missing session token")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not authorized.")
-    user = await get_user_from_session(session_token)
+    principal = await _resolve_principal(request, session_token)
+    if not principal:
+        logger.error("User does not exist")
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not authorized.")
+
+    return principal
+
+async def get_current_user(
+    request: Request,
+) -> UserOut:
+    principal = await get_current_principal(request)
+    user = await get_user_by_id(principal.user_id)
     if not user:
         logger.error("User does not exist")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not authorized.")
@@ -44,27 +66,40 @@ async def admin_only(request: Request):
         logger.error("Missing session token")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not authenticated.")
 
-    user = await get_user_from_session(session_token)
-    if not user:
+    principal = await _resolve_principal(request, session_token)
+    if not principal:
         logger.error("User does not exist")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid Session.")
 
-    if user.role != "admin":
+    if principal.role != "admin":
         logger.error("AUTH: error: user is not admin")
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin access required.")
 
+    return principal
+
 async def admin_and_staff(request: Request):
     session_token = request.cookies.get(settings.SESSION_COOKIE_NAME)
     if not session_token:
         logger.error("Not authenticated")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not authenticated.")
 
-    user = await get_user_from_session(session_token)
-    if not user:
+    principal = await _resolve_principal(request, session_token)
+    if not principal:
         logger.error("User does not exist")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid Session.")
 
-    if (user.role != "admin") and (user.role != "staff"):
+    if (principal.role != "admin") and (principal.role != "staff"):
         logger.error("error: user is not admin or staff")
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin or staff access required.")
 
+    return principal
+
+
+async def heartbeat_key(request: Request):
+    if not settings.HEARTBEAT_API_KEY:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Heartbeat ingestion is not configured.")
+
+    key = request.headers.get("x-heartbeat-key", "")
+    if not secrets.compare_digest(key.encode(), settings.HEARTBEAT_API_KEY.encode()):
+        logger.error("Invalid heartbeat key")
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid heartbeat key.")
@@ -9,3 +9,18 @@ class UserNotFound(Exception):
 
 class InvalidCredentials(Exception):
     pass
+
+class InvalidCursor(Exception):
+    pass
+
+class PasswordHashingBusy(Exception):
+    pass
+
+class PreconditionFailed(Exception):
+    pass
+
+class InvalidFields(Exception):
+    pass
+
+class LoomaIdExists(Exception):
+    pass
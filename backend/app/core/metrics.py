@@ -0,0 +1,272 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# Unmatched paths (scanners, typos) share one label so they can't blow up cardinality.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in Prometheus' layout."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, labels: Labels, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, int] = {}
+
+    def inc(self, labels: Labels, amount: int = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(labels)} {value}" for labels, value in sorted(self._values.items()))
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+http_requests = Counter("http_requests_total", "HTTP responses by route, method and status code.")
+http_latency = Histogram("http_request_duration_seconds", "Time from request to last response byte.", LATENCY_BUCKETS)
+http_round_trips = Histogram("http_request_mongo_round_trips", "MongoDB commands sent while serving one request.", ROUND_TRIP_BUCKETS)
+mongo_latency = Histogram("mongo_command_duration_seconds", "MongoDB command latency by collection and command.", LATENCY_BUCKETS)
+mongo_failures = Counter("mongo_command_failures_total", "MongoDB commands that returned an error.")
+_in_flight: Dict[str, int] = {}
+
+
+class _RequestStats:
+    __slots__ = ("scope", "round_trips")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.round_trips = 0
+
+
+_current_request: ContextVar[_RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = _RequestStats(scope)
+        token = _current_request.set(stats)
+        status_code = 500
+        method = scope["method"]
+        _in_flight[method] = _in_flight.get(method, 0) + 1
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight[method] -= 1
+            _current_request.reset(token)
+            route = (("method", method), ("route", _route(scope)))
+            http_requests.inc(route + (("status", str(status_code)),))
+            http_latency.observe(route, elapsed)
+            http_round_trips.observe(route, stats.round_trips)
+
+
+def _collection(event: monitoring.CommandStartedEvent) -> str:
+    target = event.command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    # getMore names the cursor id first and the collection separately.
+    return str(event.command.get("collection", ""))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Command latency per (collection, command), round trips per request and a slow query log."""
+
+    def __init__(self):
+        self._started: Dict[Tuple[int, object], Tuple[str, _RequestStats | None]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.round_trips += 1
+        self._started[(event.request_id, event.connection_id)] = (_collection(event), stats)
+
+    def _finished(self, event, failed: bool):
+        collection, stats = self._started.pop((event.request_id, event.connection_id), ("", None))
+        seconds = event.duration_micros / 1_000_000
+        labels = (("collection", collection), ("command", event.command_name))
+        mongo_latency.observe(labels, seconds)
+        if failed:
+            mongo_failures.inc(labels)
+        if seconds * 1000 >= settings.MONGO_SLOW_QUERY_MS > 0:
+            route = _route(stats.scope) if stats is not None else "-"
+            logger.warning(
+                f"Slow Mongo command: {event.command_name} on {event.database_name}.{collection} "
+                f"took {seconds * 1000:.0f}ms (route {route})"
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finished(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finished(event, failed=True)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+class PoolStats:
+    __slots__ = ("open", "checked_out", "waiting", "checkout_timeouts", "cleared")
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_timeouts = 0
+        self.cleared = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Live connection pool occupancy per server, for readiness and metrics."""
+
+    def __init__(self):
+        self.pools: Dict[str, PoolStats] = {}
+        # Across pools, and kept when a pool closes, so it only ever grows.
+        self.checkout_timeouts = 0
+
+    def _pool(self, event) -> PoolStats:
+        address = "%s:%s" % event.address
+        pool = self.pools.get(address)
+        if pool is None:
+            pool = self.pools[address] = PoolStats()
+        return pool
+
+    def pool_created(self, event):
+        self._pool(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._pool(event).cleared += 1
+
+    def pool_closed(self, event):
+        self.pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._pool(event).open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._pool(event).open -= 1
+
+    def connection_check_out_started(self, event):
+        self._pool(event).waiting += 1
+
+    def connection_check_out_failed(self, event):
+        pool = self._pool(event)
+        pool.waiting -= 1
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            pool.checkout_timeouts += 1
+            self.checkout_timeouts += 1
+
+    def connection_checked_out(self, event):
+        pool = self._pool(event)
+        pool.waiting -= 1
+        pool.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._pool(event).checked_out -= 1
+
+    def totals(self) -> Dict[str, int]:
+        totals = PoolStats().as_dict()
+        for pool in self.pools.values():
+            for name, value in pool.as_dict().items():
+                totals[name] += value
+        return totals
+
+
+mongo_pool_monitor = MongoPoolMonitor()
+
+
+def render_metrics(gauges: Dict[str, Tuple[str, float]], counters: Dict[str, Tuple[str, float]] | None = None) -> str:
+    """Prometheus text exposition of everything recorded, plus point-in-time gauges
+    and process-lifetime counters kept elsewhere."""
+    lines: List[str] = []
+    for metric in (http_requests, http_latency, http_round_trips, mongo_latency, mongo_failures):
+        lines.extend(metric.render())
+
+    lines += ["# HELP http_requests_in_flight Requests currently being served.", "# TYPE http_requests_in_flight gauge"]
+    lines.extend(f"http_requests_in_flight{_labels((('method', method),))} {count}" for method, count in sorted(_in_flight.items()))
+
+    for name, (help, value) in gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+    for name, (help, value) in (counters or {}).items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
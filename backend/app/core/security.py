@@ -1,9 +1,12 @@
+import asyncio
 import secrets
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from typing import Any
+from typing import Any, Callable, Dict
 import time
 
 from app.core.config import settings
+from app.core.exceptions import PasswordHashingBusy
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,5 +23,49 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(safe_password, password_hash)
 
 
+# bcrypt releases the GIL while hashing, so a small thread pool keeps the
+# event loop free without the pickling overhead of a process pool.
+_hash_executor = (
+    ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    if settings.PASSWORD_HASH_WORKERS > 0
+    else None
+)
+_hash_pending = 0
+
+
+async def _run_hashing(fn: Callable[..., Any], *args: Any) -> Any:
+    global _hash_pending
+
+    if _hash_executor is None:
+        return fn(*args)
+
+    if _hash_pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+        raise PasswordHashingBusy
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run_hashing(verify_password, password, password_hash)
+
+
+def password_hashing_stats() -> Dict[str, int]:
+    workers = max(settings.PASSWORD_HASH_WORKERS, 0)
+    return {
+        "workers": workers,
+        "in_flight": min(_hash_pending, workers),
+        "queued": max(_hash_pending - workers, 0),
+        "max_queue": settings.PASSWORD_HASH_MAX_QUEUE,
+    }
+
+
 def new_token() -> str:
     return secrets.token_hex(32)
@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from app.core.config import settings
+from app.models.user import Role
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: PydanticObjectId
+    username: str
+    role: Role
+    expires_at: datetime
+
+
+class PrincipalCache:
+    """TTL + LRU map of session token -> Principal.
+
+    Entries live for at most `ttl` seconds and never past the session's own
+    expiry, so a token revoked on another worker is honoured within `ttl`.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Principal | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        principal, deadline = entry
+        if deadline <= time.monotonic():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return principal
+
+    def put(self, token: str, principal: Principal, session_ttl: float):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        deadline = time.monotonic() + min(self.ttl, session_ttl)
+        self._entries[token] = (principal, deadline)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict_token(self, token: str):
+        self._entries.pop(token, None)
+
+    def evict_user(self, user_id: PydanticObjectId):
+        stale = [token for token, (principal, _) in self._entries.items() if principal.user_id == user_id]
+        for token in stale:
+            del self._entries[token]
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.SESSION_CACHE_TTL_SECONDS,
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,108 @@
+from typing import Dict, List, Type
+
+from beanie import Document
+from beanie.odm.fields import IndexModelField
+from pymongo import IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import OperationFailure
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Collections written through the driver directly, without a Beanie model.
+COLLECTION_INDEXES: Dict[str, List[IndexModel]] = {
+    # materialised rollups, read per level and scope
+    "school_rollups": [IndexModel([("level", 1), ("province", 1), ("district", 1), ("palika", 1)])],
+}
+
+
+def _index_drift(declared: IndexModelField, existing: IndexModelField) -> str | None:
+    declared_key = list(declared.index.document["key"].items())
+    # Text indexes are stored under synthetic _fts/_ftsx keys, so only
+    # their options can be compared.
+    if not any(direction == "text" for _, direction in declared_key):
+        existing_key = list(existing.index.document["key"].items())
+        if declared_key != existing_key:
+            return f"key {declared_key} declared but {existing_key} found"
+
+    existing_options = dict(existing.options)
+    for option, value in declared.options:
+        if option == "name":
+            continue
+        if existing_options.get(option) != value:
+            return f"{option}={value!r} declared but {existing_options.get(option)!r} found"
+    return None
+
+
+async def sync_indexes(document_models: List[Type[Document]]) -> Dict[str, List[str]]:
+    """Create the indexes declared on each model's Settings and report drift.
+
+    Indexes are created one at a time so a single failure (for example a
+    unique index over data that already has duplicates) is reported instead
+    of aborting startup. Returns {collection name: [problems]}.
+    """
+    report: Dict[str, List[str]] = {}
+
+    for model in document_models:
+        collection = model.get_pymongo_collection()
+        declared: List[IndexModelField] = model.get_settings().indexes
+        problems: List[str] = []
+        failed = set()
+
+        for index in declared:
+            try:
+                await collection.create_indexes([index.index])
+            except OperationFailure as e:
+                failed.add(index.name)
+                problems.append(f"could not create index {index.name}: {e.details.get('errmsg', e) if e.details else e}")
+
+        existing = {
+            index.name: index
+            for index in IndexModelField.from_pymongo_index_information(await collection.index_information())
+        }
+
+        for index in declared:
+            if index.name in failed:
+                continue
+            if index.name not in existing:
+                problems.append(f"missing index {index.name}")
+                continue
+            drift = _index_drift(index, existing[index.name])
+            if drift:
+                problems.append(f"index {index.name} differs: {drift}")
+
+        declared_names = {index.name for index in declared}
+        for name in existing:
+            if name not in declared_names:
+                problems.append(f"undeclared index {name}")
+
+        for problem in problems:
+            logger.warning(f"[{collection.name}] {problem}")
+        report[collection.name] = problems
+
+    return report
+
+
+async def create_collection_indexes(database: AsyncDatabase, name: str, target: str | None = None):
+    """Create the COLLECTION_INDEXES declared for `name` on `target` (default: `name` itself).
+
+    Rebuilds pass a staging collection as `target` so it is indexed before it
+    is renamed over the live one.
+    """
+    indexes = COLLECTION_INDEXES.get(name)
+    if indexes:
+        await database[target or name].create_indexes(indexes)
+
+
+async def sync_collection_indexes(database: AsyncDatabase) -> Dict[str, List[str]]:
+    report: Dict[str, List[str]] = {}
+    for name in COLLECTION_INDEXES:
+        try:
+            await create_collection_indexes(database, name)
+            report[name] = []
+        except OperationFailure as e:
+            problem = f"could not create indexes: {e.details.get('errmsg', e) if e.details else e}"
+            logger.warning(f"[{name}] {problem}")
+            report[name] = [problem]
+    return report
@@ -1,29 +1,117 @@
+import asyncio
+import time
+from typing import Any, Dict
+
 from beanie import init_beanie
-from pymongo import AsyncMongoClient
+from pymongo import AsyncMongoClient, ReadPreference
+from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.read_preferences import Nearest, PrimaryPreferred, Secondary, SecondaryPreferred
 from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import mongo_command_metrics, mongo_pool_monitor
+from app.db.indexes import sync_collection_indexes, sync_indexes
+from app.models.access_log import AccessLogDoc
+from app.models.qr_scan import QRScanDoc
 from app.models.school import School
+from app.models.school_uptime import SchoolUptimeDoc
 from app.models.session import SessionDoc
+from app.models.status_transition import StatusTransitionDoc
 from app.models.user import UserDoc
 
+logger = get_logger(__name__)
+
+DOCUMENT_MODELS = [
+    School,
+    UserDoc,
+    SessionDoc,
+    QRScanDoc,
+    AccessLogDoc,
+    StatusTransitionDoc,
+    SchoolUptimeDoc,
+]
+
+_READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
 class MongoDB:
     client: AsyncMongoClient | None = None
+    index_drift: dict[str, list[str]] = {}
+    reads_read_preference = ReadPreference.PRIMARY
+    warmed_up: bool = False
 
 db = MongoDB()
 
+def _reads_read_preference():
+    mode = _READ_PREFERENCES.get(settings.MONGO_READS_READ_PREFERENCE)
+    if mode is None:
+        return ReadPreference.PRIMARY
+    return mode(max_staleness=settings.MONGO_READS_MAX_STALENESS_SECONDS)
+
+def _client_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "event_listeners": [mongo_pool_monitor],
+    }
+    if settings.METRICS_ENABLED:
+        options["event_listeners"].append(mongo_command_metrics)
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = ",".join(settings.MONGO_COMPRESSORS)
+        options["zlibCompressionLevel"] = settings.MONGO_ZLIB_COMPRESSION_LEVEL
+    return options
+
 async def connect_to_mongo():
-    db.client = AsyncMongoClient(settings.MONGODB_URI)
+    db.client = AsyncMongoClient(settings.MONGODB_URI, **_client_options())
+    db.reads_read_preference = _reads_read_preference()
 
     await init_beanie(
         database=db.client[settings.MONGODB_DB_NAME],
-        document_models=[
-            School,
-            UserDoc,
-            SessionDoc
-        ]
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=True,
     )
+    db.index_drift = {
+        **await sync_indexes(DOCUMENT_MODELS),
+        **await sync_collection_indexes(db.client[settings.MONGODB_DB_NAME]),
+    }
+
+async def warm_up_mongo() -> bool:
+    """Open MONGO_WARMUP_CONNECTIONS connections to each server reads will use.
+
+    Concurrent pings each need their own connection, so the first requests
+    after a deploy don't pay for TCP/TLS setup and authentication. On failure
+    the readiness check stays failed and retries the warm-up on each probe.
+    """
+    database = get_db()
+    targets = {ReadPreference.PRIMARY.mongos_mode: ReadPreference.PRIMARY}
+    targets[db.reads_read_preference.mongos_mode] = db.reads_read_preference
+    try:
+        for read_preference in targets.values():
+            await asyncio.gather(*(
+                database.command("ping", read_preference=read_preference)
+                for _ in range(settings.MONGO_WARMUP_CONNECTIONS)
+            ))
+    except Exception as e:
+        logger.error(f"Mongo pool warm-up failed: {e}")
+        return False
+    db.warmed_up = True
+    return True
+
+async def ping_mongo() -> float:
+    start = time.perf_counter()
+    await asyncio.wait_for(get_db().command("ping"), settings.MONGO_READY_TIMEOUT_SECONDS)
+    return (time.perf_counter() - start) * 1000
 
 async def close_mongo_connection():
+    db.warmed_up = False
     if db.client:
         await db.client.close()
 
@@ -31,3 +119,9 @@ def get_db() -> AsyncDatabase:
     if db.client is None:
         raise RuntimeError("Database not connected. Call connect_to_mongo() first.")
     return db.client[settings.MONGODB_DB_NAME]
+
+def routed_reads(collection: AsyncCollection) -> AsyncCollection:
+    """`collection` with the read preference configured for list, search and stats reads."""
+    if db.reads_read_preference == ReadPreference.PRIMARY:
+        return collection
+    return collection.with_options(read_preference=db.reads_read_preference)
@@ -1,18 +1,55 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from app.api.main import api_router
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.core.logger import get_logger
+from app.core.metrics import MetricsMiddleware
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, warm_up_mongo
+from app.services.activity_logs import flush_activity, run_activity_flusher
+from app.services.heartbeats import heartbeat_buffer, run_heartbeat_flusher
+from app.services.offline_sweeper import run_offline_sweeper
+from app.services.school_events import run_school_change_stream
+from app.services.search_index import run_school_search_index
+
+logger = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Before yielding, so the server only starts accepting requests on a warm pool.
+    await warm_up_mongo()
+
+    background_tasks = [asyncio.create_task(run_heartbeat_flusher()), asyncio.create_task(run_activity_flusher())]
+    if settings.SCHOOL_SEARCH_INDEX:
+        background_tasks.append(asyncio.create_task(run_school_search_index()))
+    if settings.SCHOOL_EVENTS_SOURCE == "change_stream":
+        background_tasks.append(asyncio.create_task(run_school_change_stream()))
+    if settings.SCHOOL_OFFLINE_SWEEP_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_offline_sweeper()))
 
     yield
 
-    await close_mongo_connection()
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+
+    try:
+        # Don't lose the last interval of device liveness on deploy.
+        try:
+            await heartbeat_buffer.flush()
+        except Exception as e:
+            logger.error(f"Final heartbeat flush failed: {e}")
+        try:
+            await flush_activity()
+        except Exception as e:
+            logger.error(f"Final activity flush failed: {e}")
+    finally:
+        await close_mongo_connection()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -23,6 +60,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router)
 
 # @app.get("/settings")
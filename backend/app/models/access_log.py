@@ -0,0 +1,28 @@
+from datetime import datetime
+from beanie import Document, Granularity, PydanticObjectId, TimeSeriesConfig
+from pymongo import IndexModel
+
+from app.core.config import settings
+
+
+class AccessLogDoc(Document):
+    schoolId: PydanticObjectId
+    timestamp: datetime
+    userId: PydanticObjectId
+    user: str
+    action: str
+    details: str | None = None
+    ipAddress: str | None = None
+
+    class Settings:
+        name = "access_logs"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="schoolId",
+            granularity=Granularity.minutes,
+            expire_after_seconds=settings.ACTIVITY_RETENTION_DAYS * 86400 if settings.ACTIVITY_RETENTION_DAYS else None,
+        )
+        indexes = [
+            IndexModel([("schoolId", 1), ("timestamp", 1)]),
+            IndexModel([("userId", 1), ("timestamp", 1)]),
+        ]
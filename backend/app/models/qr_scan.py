@@ -0,0 +1,31 @@
+from datetime import datetime
+from beanie import Document, Granularity, PydanticObjectId, TimeSeriesConfig
+from pymongo import IndexModel
+
+from app.core.config import settings
+
+
+class QRScanDoc(Document):
+    schoolId: PydanticObjectId
+    timestamp: datetime
+    loomaId: str
+    staffName: str
+    userId: PydanticObjectId | None = None
+    notes: str | None = None
+
+    class Settings:
+        name = "qr_scans"
+        # time-series collection: scans are bucketed per school, so a
+        # school's history is read from a handful of compressed buckets
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="schoolId",
+            granularity=Granularity.minutes,
+            expire_after_seconds=settings.ACTIVITY_RETENTION_DAYS * 86400 if settings.ACTIVITY_RETENTION_DAYS else None,
+        )
+        indexes = [
+            # per-school and per-user history (read newest first); the first
+            # one is what MongoDB 6.3+ creates by itself for time-series collections
+            IndexModel([("schoolId", 1), ("timestamp", 1)]),
+            IndexModel([("userId", 1), ("timestamp", 1)]),
+        ]
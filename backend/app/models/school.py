@@ -1,3 +1,4 @@
+from typing import List, Literal
 from beanie import Document
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
@@ -15,6 +16,10 @@ class LoomaInfo(BaseModel):
     version: str
     lastUpdate: datetime
 
+class GeoPoint(BaseModel):
+    type: Literal["Point"] = "Point"
+    coordinates: List[float] # [longitude, latitude]
+
 class School(Document):
     name: str
     latitude: float
@@ -30,6 +35,10 @@ class School(Document):
     looma: LoomaInfo
     createdAt: datetime
     updatedAt: datetime
+    # mirror of latitude/longitude kept in sync by the write services
+    location: GeoPoint | None = None
+    # bumped by every edit made through the API (not by heartbeats); If-Match pins writes to it
+    revision: int = 0
 
     class Settings:
         name = "schools"
@@ -39,6 +48,20 @@ class School(Document):
                 ("province", "text"),
                 ("district", "text"),
                 ("palika", "text")
-            ])
+            ]),
+            IndexModel([("location", "2dsphere")]),
+            # bounding-box queries and clusters: planar ranges over the coordinates
+            IndexModel([("latitude", 1), ("longitude", 1)]),
+            # province -> district -> palika rollups, grouped by status and looma version
+            IndexModel([("province", 1), ("district", 1), ("palika", 1), ("status", 1), ("looma.version", 1)]),
+            # offline sweeper: online schools by lastSeen
+            IndexModel([("status", 1), ("lastSeen", 1)]),
+            # bulk import upserts by loomaId; unique so concurrent imports can't create duplicates
+            IndexModel([("loomaId", 1)], unique=True, partialFilterExpression={"loomaId": {"$type": "string"}}),
+            # keyset pagination: one index per (filter, sort key) the list endpoint supports
+            IndexModel([("name", 1), ("_id", 1)]),
+            IndexModel([("updatedAt", -1), ("_id", -1)]),
+            IndexModel([("province", 1), ("name", 1), ("_id", 1)]),
+            IndexModel([("province", 1), ("updatedAt", -1), ("_id", -1)]),
         ]
 
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Dict, Literal
+from beanie import Document, PydanticObjectId
+from pymongo import IndexModel
+
+
+class SchoolUptimeDoc(Document):
+    """Seconds a school spent in each status during one UTC day or ISO week."""
+
+    schoolId: PydanticObjectId
+    period: Literal["day", "week"]
+    start: datetime
+    province: str | None = None
+    seconds: Dict[str, float] = {}
+
+    class Settings:
+        name = "school_uptime"
+        indexes = [
+            # per-school ranges; also the key transitions upsert into
+            IndexModel([("schoolId", 1), ("period", 1), ("start", 1)], unique=True),
+            # fleet-wide and per-province ranges
+            IndexModel([("period", 1), ("start", 1), ("province", 1)]),
+        ]
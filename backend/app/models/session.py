@@ -1,5 +1,6 @@
 from datetime import datetime
 from beanie import Document, PydanticObjectId
+from pymongo import IndexModel
 
 
 class SessionDoc(Document):
@@ -10,3 +11,9 @@ class SessionDoc(Document):
 
     class Settings:
         name = "sessions"
+        indexes = [
+            IndexModel([("token", 1)], unique=True),
+            IndexModel([("userId", 1)]),
+            # Mongo's TTL monitor deletes sessions once expiresAt has passed
+            IndexModel([("expiresAt", 1)], expireAfterSeconds=0),
+        ]
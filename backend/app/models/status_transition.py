@@ -0,0 +1,19 @@
+from datetime import datetime
+from beanie import Document, Granularity, PydanticObjectId, TimeSeriesConfig
+from pymongo import IndexModel
+
+
+class StatusTransitionDoc(Document):
+    schoolId: PydanticObjectId
+    timestamp: datetime
+    status: str | None = None # None once the school was deleted
+    previous: str | None = None # None for a new school
+    province: str | None = None
+
+    class Settings:
+        name = "status_transitions"
+        # append-only history; the uptime rollups are derived from the same writes
+        timeseries = TimeSeriesConfig(time_field="timestamp", meta_field="schoolId", granularity=Granularity.minutes)
+        indexes = [
+            IndexModel([("schoolId", 1), ("timestamp", 1)]),
+        ]
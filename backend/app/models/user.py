@@ -3,6 +3,8 @@ from beanie import Document
 from pydantic import EmailStr
 from datetime import datetime
 
+from pymongo import IndexModel
+
 Role = Literal["admin", "staff", "viewer"]
 
 class UserDoc(Document):
@@ -15,3 +17,7 @@ class UserDoc(Document):
 
     class Settings:
         name = "users"
+        indexes = [
+            IndexModel([("username", 1)], unique=True),
+            IndexModel([("email", 1)], unique=True),
+        ]
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field, field_validator
+
+from app.utils.dates import now_utc
+
+
+class QRScanIn(BaseModel):
+    loomaId: str | None = None # defaults to the school's loomaId
+    staffName: str | None = None # defaults to the signed-in user's name
+    timestamp: datetime = Field(default_factory=now_utc)
+    notes: str | None = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def assume_utc(cls, value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class QRScanOut(BaseModel):
+    id: PydanticObjectId
+    schoolId: PydanticObjectId
+    timestamp: datetime
+    loomaId: str
+    staffName: str
+    userId: PydanticObjectId | None = None
+    notes: str | None = None
+
+class AccessLogIn(BaseModel):
+    action: str
+    details: str | None = None
+
+class AccessLogOut(BaseModel):
+    id: PydanticObjectId
+    schoolId: PydanticObjectId
+    timestamp: datetime
+    userId: PydanticObjectId
+    user: str
+    action: str
+    details: str | None = None
+    ipAddress: str | None = None
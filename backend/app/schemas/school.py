@@ -1,14 +1,21 @@
 from enum import Enum
-from typing import List
+from typing import Any, Dict, List, Literal
 from beanie import PydanticObjectId
-from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from datetime import date, datetime, timezone
+
+from app.schemas.activity import AccessLogOut, QRScanOut
+from app.utils.dates import now_utc
 
 class SchoolStatus(str, Enum):
     ONLINE = "online"
     OFFLINE = "offline"
     MAINTENANCE = "maintenance"
 
+class SchoolSort(str, Enum):
+    NAME = "name"
+    UPDATED_AT = "updatedAt"
+
 class Contact(BaseModel):
     email: EmailStr
     phone: str
@@ -45,10 +52,15 @@ class SchoolOut(BaseModel):
     loomaId: str
     loomaCount: int
     looma: LoomaInfo
+    revision: int = 0 # send as If-Match to reject the write if the school changed since
     # createdAt: datetime
     # updatedAt: datetime
-    qrScans: List[str] | None = []
-    accessLogs: List[str] | None = []
+    # latest entries on GET /schools/{id}; empty in lists
+    qrScans: List[QRScanOut] | None = []
+    accessLogs: List[AccessLogOut] | None = []
+    # over the last SCHOOL_ACTIVITY_COUNT_DAYS; on the detail and on lists with ?activity=true
+    qrScanCount: int | None = None
+    accessLogCount: int | None = None
 
 class SchoolCreate(BaseModel):
     name: str
@@ -80,3 +92,112 @@ class SchoolUpdate(BaseModel):
 
 class SchoolUpdateStatus(BaseModel):
     status: SchoolStatus
+
+class SchoolBulkFilter(BaseModel):
+    ids: List[PydanticObjectId] | None = None
+    province: str | None = None
+    district: str | None = None
+    palika: str | None = None
+    status: SchoolStatus | None = None
+
+    @model_validator(mode="after")
+    def not_empty(self):
+        # An empty filter would match the whole fleet.
+        if all(value is None for value in self.model_dump().values()):
+            raise ValueError("filter needs at least one of ids, province, district, palika or status")
+        return self
+
+class SchoolBulkPatch(BaseModel):
+    # fields that make sense to set on many schools at once
+    status: SchoolStatus | None = None
+    province: str | None = None
+    district: str | None = None
+    palika: str | None = None
+    lastSeen: datetime | None = None
+    loomaCount: int | None = None
+
+    @model_validator(mode="after")
+    def not_empty(self):
+        # Would only bump revision and updatedAt on every matched school.
+        if not self.model_fields_set:
+            raise ValueError("patch needs at least one of status, province, district, palika, lastSeen or loomaCount")
+        # None would be written as is, over fields every school must have.
+        nulls = sorted(field for field in self.model_fields_set if getattr(self, field) is None)
+        if nulls:
+            raise ValueError(f"patch fields can't be null: {', '.join(nulls)}")
+        return self
+
+class SchoolBulkUpdate(BaseModel):
+    filter: SchoolBulkFilter
+    patch: SchoolBulkPatch
+    dry_run: bool = False
+
+class SchoolBulkDelete(BaseModel):
+    filter: SchoolBulkFilter
+    dry_run: bool = False
+
+class SchoolBulkResult(BaseModel):
+    matched: int = 0
+    modified: int = 0 # deleted, for deletes
+    dry_run: bool = False
+
+class SchoolImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class SchoolImportResult(BaseModel):
+    received: int = 0
+    upserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    failed: int = 0
+    superseded: int = 0 # rows replaced by a later row with the same loomaId
+    errors: List[Dict[str, Any]] = []
+    errors_truncated: int = 0
+
+class HeartbeatIn(BaseModel):
+    loomaId: str
+    status: SchoolStatus
+    lastSeen: datetime = Field(default_factory=now_utc)
+    version: str | None = None
+
+    @field_validator("lastSeen")
+    @classmethod
+    def assume_utc(cls, value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class SchoolCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    statuses: Dict[str, int]
+    schoolId: PydanticObjectId | None = None # set when the cluster is a single school
+
+class SchoolClusters(BaseModel):
+    clusters: List[SchoolCluster]
+    truncated: bool = False # more than GEO_MAX_CLUSTERS cells; zoom in or narrow the box
+
+class RollupLevel(str, Enum):
+    PROVINCE = "province"
+    DISTRICT = "district"
+    PALIKA = "palika"
+
+class RollupNode(BaseModel):
+    name: str
+    level: RollupLevel
+    total: int = 0
+    statuses: Dict[str, int] = {}
+    versions: Dict[str, int] = {}
+
+class UptimeBucket(BaseModel):
+    start: datetime
+    seconds: Dict[str, float]
+    uptime: float | None = None # online / (online + offline); maintenance is excluded
+
+class SchoolUptime(BaseModel):
+    from_: date = Field(alias="from")
+    to: date
+    granularity: Literal["day", "week"]
+    seconds: Dict[str, float]
+    uptime: float | None = None
+    series: List[UptimeBucket]
@@ -0,0 +1,116 @@
+"""Production entry point: pre-forked uvicorn workers on uvloop and httptools.
+
+    python -m app.serve --workers 8 --port 8000
+
+Each worker runs the app's own lifespan, so it has its own Mongo pool, search
+index and heartbeat buffer. The parent respawns workers that exit, whether
+they crashed or were recycled after --max-requests. On SIGTERM/SIGINT the
+workers stop accepting connections and drain in-flight requests for up to
+--graceful-timeout seconds. SIGHUP restarts all workers, and SIGTTIN/SIGTTOU
+add or remove one.
+"""
+import argparse
+import os
+import random
+import socket
+from functools import partial
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _reuse_port_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(config: uvicorn.Config, reuse_port: bool, max_requests_jitter: int, sockets=None):
+    """Worker body; runs in the spawned child (or in-process for a single worker)."""
+    if config.limit_max_requests is not None and max_requests_jitter > 0:
+        # Spread recycling out so the workers don't all restart at once.
+        config.limit_max_requests += random.randint(0, max_requests_jitter)
+    if reuse_port:
+        # Every worker listens on its own socket and the kernel balances
+        # connections between them, instead of all workers racing on one accept queue.
+        sockets = [_reuse_port_socket(config.host, config.port, config.backlog)]
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main(args: argparse.Namespace):
+    workers = args.workers or os.cpu_count() or 1
+
+    if args.mongo_pool_budget:
+        # Workers read Settings from the environment they inherit.
+        per_worker = max(args.mongo_pool_budget // workers, 1)
+        os.environ["MONGO_MAX_POOL_SIZE"] = str(per_worker)
+        os.environ["MONGO_MIN_POOL_SIZE"] = str(min(settings.MONGO_MIN_POOL_SIZE, per_worker))
+    if workers > 1 and settings.SCHOOL_EVENTS_SOURCE == "local":
+        logger.warning(
+            "SCHOOL_EVENTS_SOURCE=local with several workers: /schools/events clients only see "
+            "writes handled by their own worker; use change_stream"
+        )
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        proxy_headers=args.proxy_headers,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        access_log=args.access_log,
+    )
+    target = partial(_run_worker, config, args.reuse_port, args.max_requests_jitter)
+
+    if workers == 1:
+        target()
+        return
+
+    # Shared mode binds once in the parent and hands the socket to every worker.
+    sockets = [] if args.reuse_port else [config.bind_socket()]
+    Multiprocess(config, target=target, sockets=sockets).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS, help="0 starts one per CPU")
+    parser.add_argument(
+        "--reuse-port",
+        action=argparse.BooleanOptionalAction,
+        default=settings.SERVE_REUSE_PORT,
+        help="one SO_REUSEPORT socket per worker instead of a shared one (Linux/BSD)",
+    )
+    parser.add_argument("--max-requests", type=int, default=settings.SERVE_MAX_REQUESTS, help="recycle a worker after this many requests; 0 never")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVE_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVE_GRACEFUL_TIMEOUT_SECONDS, help="seconds to drain in-flight requests on shutdown")
+    parser.add_argument("--keepalive", type=int, default=settings.SERVE_KEEPALIVE_SECONDS)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument(
+        "--mongo-pool-budget",
+        type=int,
+        default=settings.SERVE_MONGO_POOL_BUDGET,
+        help="total Mongo connections across workers; overrides MONGO_MAX_POOL_SIZE per worker",
+    )
+    parser.add_argument("--proxy-headers", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--forwarded-allow-ips", default=None)
+    parser.add_argument("--access-log", action=argparse.BooleanOptionalAction, default=False)
+    main(parser.parse_args())
@@ -0,0 +1,233 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Type
+
+from beanie import Document
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.core.exceptions import InvalidCursor
+from app.core.logger import get_logger
+from app.models.access_log import AccessLogDoc
+from app.models.qr_scan import QRScanDoc
+from app.services.school_version import bump_school_activity_version
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.dates import now_utc
+
+logger = get_logger(__name__)
+
+ActivityEntry = Dict[str, Any]
+
+# Either buffer filling up wakes the one flusher.
+_flush_requested = asyncio.Event()
+
+
+class ActivityBuffer:
+    """Time-series entries waiting to be written with one insert_many per flush."""
+
+    def __init__(self, document: Type[Document]):
+        self.document = document
+        self.dropped = 0
+        self._pending: List[ActivityEntry] = []
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, entry: ActivityEntry) -> ActivityEntry:
+        """Queue `entry` and return it with the _id it will be stored under."""
+        entry = {"_id": ObjectId(), **entry}
+        if len(self._pending) >= settings.ACTIVITY_BUFFER_MAX_ENTRIES:
+            # Mongo has been unreachable for a while; don't grow without bound.
+            self.dropped += 1
+            return entry
+        self._pending.append(entry)
+        if len(self._pending) >= settings.ACTIVITY_FLUSH_MAX_PENDING:
+            _flush_requested.set()
+        return entry
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            entries, self._pending = self._pending, []
+            try:
+                await self.document.get_pymongo_collection().insert_many(entries, ordered=False)
+            except BulkWriteError as e:
+                # The rest were written; the rejected entries would be rejected again.
+                failed = len(e.details.get("writeErrors", []))
+                logger.error(f"Dropped {failed} {self.document.get_collection_name()} entries rejected by MongoDB")
+                return len(entries) - failed
+            except BaseException:
+                # Keep them for the next flush (including the final one at shutdown).
+                self._pending[:0] = entries[:settings.ACTIVITY_BUFFER_MAX_ENTRIES - len(self._pending)]
+                raise
+            return len(entries)
+
+
+qr_scan_buffer = ActivityBuffer(QRScanDoc)
+access_log_buffer = ActivityBuffer(AccessLogDoc)
+
+
+async def flush_activity() -> int:
+    written = 0
+    for buffer in (qr_scan_buffer, access_log_buffer):
+        try:
+            written += await buffer.flush()
+        except Exception as e:
+            logger.error(f"{buffer.document.get_collection_name()} flush failed: {e}")
+    if written:
+        try:
+            # Invalidates the ETags of responses that embed activity.
+            await bump_school_activity_version()
+        except Exception as e:
+            logger.error(f"Activity version bump failed after writing {written} entries: {e}")
+    return written
+
+
+async def run_activity_flusher():
+    while True:
+        try:
+            await asyncio.wait_for(_flush_requested.wait(), settings.ACTIVITY_FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_requested.clear()
+        try:
+            await flush_activity()
+        except Exception as e:
+            logger.error(f"Activity flush failed: {e}")
+
+
+def record_access(
+    school_id: ObjectId,
+    user_id: ObjectId,
+    user: str,
+    action: str,
+    details: str | None = None,
+    ip_address: str | None = None,
+) -> ActivityEntry:
+    """Buffer an access log entry; it reaches MongoDB with the next flush."""
+    return access_log_buffer.add({
+        "schoolId": school_id,
+        "timestamp": now_utc(),
+        "userId": user_id,
+        "user": user,
+        "action": action,
+        "details": details,
+        "ipAddress": ip_address,
+    })
+
+
+def activity_out(entry: ActivityEntry) -> ActivityEntry:
+    out = {"id": entry["_id"]}
+    out.update((field, value) for field, value in entry.items() if field != "_id")
+    return out
+
+
+def _page_filter(cursor: str) -> Dict[str, Any]:
+    payload = decode_cursor(cursor)
+    seen = payload.get("seen")
+    if not isinstance(payload.get("t"), datetime) or not isinstance(seen, list) or not all(isinstance(i, ObjectId) for i in seen):
+        raise InvalidCursor
+    # Sorting on the time field alone lets MongoDB read buckets in order;
+    # entries sharing the last timestamp are told apart by the ids already sent.
+    return {"timestamp": {"$lte": payload["t"]}, "_id": {"$nin": seen}}
+
+
+async def list_activity(
+    document: Type[Document],
+    owner: Dict[str, ObjectId],
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = settings.ACTIVITY_PAGE_DEFAULT_LIMIT,
+    cursor: str | None = None,
+) -> Dict[str, Any]:
+    """One page of `owner`'s entries ({"schoolId": ...} or {"userId": ...}), newest first."""
+    clauses: List[Dict[str, Any]] = [owner]
+    if since is not None:
+        clauses.append({"timestamp": {"$gte": since}})
+    if until is not None:
+        clauses.append({"timestamp": {"$lt": until}})
+    page_filter = _page_filter(cursor) if cursor is not None else None
+    if page_filter is not None:
+        clauses.append(page_filter)
+
+    docs = await (
+        document.get_pymongo_collection()
+        .find({"$and": clauses})
+        .sort("timestamp", -1)
+        .limit(limit + 1)
+        .to_list()
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]["timestamp"]
+        seen = [doc["_id"] for doc in docs if doc["timestamp"] == last]
+        if page_filter is not None and page_filter["timestamp"]["$lte"] == last:
+            seen = page_filter["_id"]["$nin"] + seen
+        next_cursor = encode_cursor({"t": last, "seen": seen})
+
+    return {"items": [activity_out(doc) for doc in docs], "next_cursor": next_cursor}
+
+
+def _count_window() -> Dict[str, Any]:
+    if not settings.SCHOOL_ACTIVITY_COUNT_DAYS:
+        return {}
+    return {"timestamp": {"$gte": now_utc() - timedelta(days=settings.SCHOOL_ACTIVITY_COUNT_DAYS)}}
+
+
+async def school_activity_counts(school_ids: List[ObjectId] | None = None) -> Dict[ObjectId, Dict[str, int]]:
+    """qrScanCount and accessLogCount per school, from one aggregation over both collections."""
+    match = _count_window()
+    if school_ids is not None:
+        match["schoolId"] = {"$in": school_ids}
+
+    def count_by_school(field: str) -> List[Dict[str, Any]]:
+        # Grouping on the meta field is answered per bucket.
+        return [{"$match": match}, {"$group": {"_id": "$schoolId", field: {"$sum": 1}}}]
+
+    pipeline = count_by_school("qrScanCount") + [
+        {"$unionWith": {"coll": AccessLogDoc.get_collection_name(), "pipeline": count_by_school("accessLogCount")}},
+        {"$group": {"_id": "$_id", "qrScanCount": {"$sum": "$qrScanCount"}, "accessLogCount": {"$sum": "$accessLogCount"}}},
+    ]
+    cursor = await QRScanDoc.get_pymongo_collection().aggregate(pipeline)
+    return {doc.pop("_id"): doc async for doc in cursor}
+
+
+def attach_activity_counts(schools: List[Dict[str, Any]], counts: Dict[ObjectId, Dict[str, int]]):
+    for school in schools:
+        school_counts = counts.get(school["id"], {})
+        school["qrScanCount"] = school_counts.get("qrScanCount", 0)
+        school["accessLogCount"] = school_counts.get("accessLogCount", 0)
+
+
+def school_activity_stages() -> List[Dict[str, Any]]:
+    """$lookup stages adding the latest entries and windowed counts to school documents."""
+    window = _count_window()
+
+    def lookup(document: Type[Document], pipeline: List[Dict[str, Any]], as_field: str) -> Dict[str, Any]:
+        return {"$lookup": {
+            "from": document.get_collection_name(),
+            "localField": "_id",
+            "foreignField": "schoolId",
+            "pipeline": pipeline,
+            "as": as_field,
+        }}
+
+    stages = []
+    if settings.SCHOOL_ACTIVITY_RECENT_ENTRIES > 0:
+        recent = [{"$sort": {"timestamp": -1}}, {"$limit": settings.SCHOOL_ACTIVITY_RECENT_ENTRIES}]
+        stages += [lookup(QRScanDoc, recent, "qrScans"), lookup(AccessLogDoc, recent, "accessLogs")]
+
+    count = ([{"$match": window}] if window else []) + [{"$count": "n"}]
+    return stages + [
+        lookup(QRScanDoc, count, "qrScanCount"),
+        lookup(AccessLogDoc, count, "accessLogCount"),
+        {"$set": {
+            "qrScanCount": {"$ifNull": [{"$first": "$qrScanCount.n"}, 0]},
+            "accessLogCount": {"$ifNull": [{"$first": "$accessLogCount.n"}, 0]},
+        }},
+    ]
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from app.core.exceptions import InvalidCredentials, UserNotFound
-from app.core.security import get_password_hash, new_token, verify_password
+from app.core.security import get_password_hash_async, new_token, verify_password_async
+from app.core.session_cache import Principal, principal_cache
 from app.models.user import UserDoc
 from app.models.session import SessionDoc
 from app.core.config import settings
@@ -14,7 +15,7 @@ async def login(identifier: str, password: str):
     if not user:
         return None
 
-    if not verify_password(password, user.passwordHash):
+    if not await verify_password_async(password, user.passwordHash):
         return None
 
     token = new_token()
@@ -38,24 +39,44 @@ async def login(identifier: str, password: str):
     return user, token, expires
 
 async def logout(token: str):
-    sessoin_to_delete = await SessionDoc.find_one(SessionDoc.token == token)
-    if sessoin_to_delete is not None:
-        await sessoin_to_delete.delete()
+    await SessionDoc.find_one(SessionDoc.token == token).delete()
+    # Only once the session is gone, or a request in between would cache it again.
+    principal_cache.evict_token(token)
+
+async def get_principal_from_session(token: str) -> Principal | None:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        if principal.expires_at > datetime.now(timezone.utc):
+            return principal
+        principal_cache.evict_token(token)
 
-async def get_user_from_session(token: str) -> UserDoc | None:
     user_session = await SessionDoc.find_one(SessionDoc.token == token)
 
     if not user_session:
         return None
 
-    expires_at = user_session.expiresAt
-    if expires_at and expires_at.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+    expires_at = user_session.expiresAt.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    if expires_at <= now:
         await user_session.delete()
         return None
 
-    user_id = user_session.userId
+    user = await UserDoc.find_one(UserDoc.id == user_session.userId)
+    if not user or user.id is None:
+        return None
+
+    principal = Principal(user_id=user.id, username=user.username, role=user.role, expires_at=expires_at)
+    principal_cache.put(token, principal, (expires_at - now).total_seconds())
+    return principal
 
-    user = await UserDoc.find_one(UserDoc.id == user_id)
+async def get_user_from_session(token: str) -> UserDoc | None:
+    principal = await get_principal_from_session(token)
+    if principal is None:
+        return None
+
+    user = await UserDoc.find_one(UserDoc.id == principal.user_id)
+    if not user:
+        principal_cache.evict_token(token)
     return user
 
 async def update_user_password(user_id, old_password, new_password):
@@ -64,8 +85,9 @@ async def update_user_password(user_id, old_password, new_password):
     if not user_to_update:
         raise UserNotFound
 
-    if not verify_password(old_password, user_to_update.passwordHash):
+    if not await verify_password_async(old_password, user_to_update.passwordHash):
         raise InvalidCredentials
 
-    user_to_update.passwordHash = get_password_hash(new_password)
+    user_to_update.passwordHash = await get_password_hash_async(new_password)
     await user_to_update.save()
+    principal_cache.evict_user(user_id)
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import timezone
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.school import School
+from app.schemas.school import HeartbeatIn
+from app.services.school_changes import SchoolChange, apply_set
+from app.services.schools import record_school_changes
+from app.utils.dates import now_utc
+
+logger = get_logger(__name__)
+
+
+def _seen_since(doc: Dict[str, Any], heartbeat: HeartbeatIn) -> bool:
+    last_seen = doc.get("lastSeen")
+    if last_seen is None:
+        return False
+    # Mongo hands back naive UTC datetimes.
+    if last_seen.tzinfo is None:
+        last_seen = last_seen.replace(tzinfo=timezone.utc)
+    return last_seen >= heartbeat.lastSeen
+
+
+class HeartbeatBuffer:
+    """Latest heartbeat per loomaId, written out as one bulk_write per flush."""
+
+    def __init__(self):
+        self.dropped = 0
+        self._pending: Dict[str, HeartbeatIn] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _merge(self, heartbeat: HeartbeatIn):
+        current = self._pending.get(heartbeat.loomaId)
+        if current is None and len(self._pending) >= settings.HEARTBEAT_BUFFER_MAX_ENTRIES:
+            # Mongo has been unreachable for a while; don't grow without bound.
+            self.dropped += 1
+            return
+        if current is None or current.lastSeen <= heartbeat.lastSeen:
+            self._pending[heartbeat.loomaId] = heartbeat
+
+    def add(self, heartbeat: HeartbeatIn):
+        # A device clock running ahead would otherwise keep its school online
+        # past the offline sweep and shadow every real heartbeat after it.
+        now = now_utc()
+        if heartbeat.lastSeen > now:
+            heartbeat = heartbeat.model_copy(update={"lastSeen": now})
+        self._merge(heartbeat)
+        if len(self._pending) >= settings.HEARTBEAT_FLUSH_MAX_PENDING:
+            self._flush_requested.set()
+
+    async def wait_for_flush(self, timeout: float):
+        """Return after `timeout` seconds or as soon as the buffer fills up."""
+        try:
+            await asyncio.wait_for(self._flush_requested.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._flush_requested.clear()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            heartbeats, self._pending = self._pending, {}
+            try:
+                await self._write(heartbeats)
+            except BaseException:
+                # Keep them for the next flush (including the final one at
+                # shutdown); anything newer that arrived meanwhile still wins.
+                for heartbeat in heartbeats.values():
+                    self._merge(heartbeat)
+                raise
+            return len(heartbeats)
+
+    async def _write(self, heartbeats: Dict[str, HeartbeatIn]):
+        collection = School.get_pymongo_collection()
+        now = now_utc()
+
+        before = {
+            doc["loomaId"]: doc
+            async for doc in collection.find({"loomaId": {"$in": list(heartbeats)}})
+        }
+
+        ops = []
+        changes: List[SchoolChange] = []
+        for loomaId, heartbeat in heartbeats.items():
+            fields = {"status": heartbeat.status.value, "lastSeen": heartbeat.lastSeen, "updatedAt": now}
+            if heartbeat.version is not None:
+                fields["looma.version"] = heartbeat.version
+            # Only ever move lastSeen forward: a heartbeat that was delayed, or
+            # flushed late by another worker, must not roll the school back.
+            ops.append(UpdateOne({"loomaId": loomaId, "lastSeen": {"$not": {"$gte": heartbeat.lastSeen}}}, {"$set": fields}))
+
+            doc = before.get(loomaId)
+            if doc is not None and not _seen_since(doc, heartbeat):
+                changes.append(SchoolChange(doc, apply_set(doc, fields)))
+
+        unknown = len(heartbeats) - len(before)
+        if unknown:
+            logger.warning(f"Dropped heartbeats from {unknown} unknown loomaId(s)")
+
+        await collection.bulk_write(ops, ordered=False)
+        await record_school_changes(changes)
+
+
+heartbeat_buffer = HeartbeatBuffer()
+
+
+async def run_heartbeat_flusher():
+    while True:
+        await heartbeat_buffer.wait_for_flush(settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+        try:
+            await heartbeat_buffer.flush()
+        except Exception as e:
+            logger.error(f"Heartbeat flush failed: {e}")
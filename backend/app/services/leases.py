@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongodb import get_db
+from app.utils.dates import now_utc
+
+LEASES_COLLECTION = "leases"
+
+
+async def acquire_lease(name: str, owner: str, ttl_seconds: float) -> bool:
+    """Take or renew the `name` lease for `owner`; False while someone else holds it.
+
+    Leases expire on their own, so a worker that dies without releasing its
+    lease blocks the others for at most `ttl_seconds`.
+    """
+    now = now_utc()
+    try:
+        await get_db()[LEASES_COLLECTION].update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expiresAt": {"$lte": now}}]},
+            {"$set": {"owner": owner, "expiresAt": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lease exists, is held by someone else and hasn't expired.
+        return False
+    return True
+
+
+async def release_lease(name: str, owner: str):
+    await get_db()[LEASES_COLLECTION].delete_one({"_id": name, "owner": owner})
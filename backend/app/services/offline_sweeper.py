@@ -0,0 +1,71 @@
+import asyncio
+import os
+import socket
+from datetime import timedelta
+from typing import List
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.school import School
+from app.schemas.school import SchoolStatus
+from app.services.leases import acquire_lease, release_lease
+from app.services.school_changes import SchoolChange, apply_set
+from app.services.schools import record_school_changes
+from app.utils.dates import now_utc
+
+logger = get_logger(__name__)
+
+SWEEPER_LEASE = "offline_sweeper"
+# unique per worker process, also across hosts
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def sweep_offline_schools() -> int:
+    """Mark online schools whose lastSeen is older than SCHOOL_OFFLINE_AFTER_SECONDS offline.
+
+    Reads only the schools that are about to change, through the
+    (status, lastSeen) index, so a sweep that finds nothing costs one index probe.
+    """
+    collection = School.get_pymongo_collection()
+    now = now_utc()
+    stale = {"status": SchoolStatus.ONLINE.value, "lastSeen": {"$lt": now - timedelta(seconds=settings.SCHOOL_OFFLINE_AFTER_SECONDS)}}
+
+    before = await collection.find(stale).limit(settings.SCHOOL_OFFLINE_SWEEP_BATCH_SIZE).to_list()
+    if not before:
+        return 0
+
+    fields = {"status": SchoolStatus.OFFLINE.value, "updatedAt": now}
+    # Re-checks the staleness filter, so a heartbeat that landed since the read wins.
+    result = await collection.update_many({"_id": {"$in": [doc["_id"] for doc in before]}, **stale}, {"$set": fields})
+    if result.modified_count < len(before):
+        still_stale = {doc["_id"] async for doc in collection.find(
+            {"_id": {"$in": [doc["_id"] for doc in before]}, "status": SchoolStatus.OFFLINE.value, "updatedAt": now}, {"_id": 1}
+        )}
+        before = [doc for doc in before if doc["_id"] in still_stale]
+
+    changes: List[SchoolChange] = [SchoolChange(doc, apply_set(doc, fields)) for doc in before]
+    await record_school_changes(changes)
+    logger.info(f"Marked {len(changes)} school(s) offline: no heartbeat for {settings.SCHOOL_OFFLINE_AFTER_SECONDS}s")
+    return len(changes)
+
+
+async def run_offline_sweeper():
+    """Sweep every SCHOOL_OFFLINE_SWEEP_INTERVAL_SECONDS on whichever worker holds the lease."""
+    # Outlives a missed sweep or two, so the holder keeps it while it's alive.
+    lease_ttl = settings.SCHOOL_OFFLINE_SWEEP_INTERVAL_SECONDS * 3
+    try:
+        while True:
+            try:
+                if await acquire_lease(SWEEPER_LEASE, _owner, lease_ttl):
+                    # A full batch means more may be waiting; keep going.
+                    while await sweep_offline_schools() >= settings.SCHOOL_OFFLINE_SWEEP_BATCH_SIZE:
+                        pass
+            except Exception as e:
+                logger.error(f"Offline sweep failed: {e}")
+            await asyncio.sleep(settings.SCHOOL_OFFLINE_SWEEP_INTERVAL_SECONDS)
+    finally:
+        # Let another worker take over straight away on shutdown.
+        try:
+            await release_lease(SWEEPER_LEASE, _owner)
+        except Exception as e:
+            logger.error(f"Could not release the offline sweeper lease: {e}")
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.school import School
+from app.schemas.school import SchoolBulkFilter, SchoolBulkPatch, SchoolBulkResult
+from app.services.school_changes import SchoolChange, apply_set
+from app.services.school_counters import reconcile_school_counters
+from app.services.school_rollups import rebuild_school_rollups
+from app.services.schools import record_school_changes
+from app.services.search_index import SEARCH_FIELDS
+from app.utils.dates import now_utc
+
+logger = get_logger(__name__)
+
+
+def bulk_filter(selection: SchoolBulkFilter) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if selection.ids is not None:
+        query["_id"] = {"$in": selection.ids}
+    for field in ("province", "district", "palika"):
+        value = getattr(selection, field)
+        if value is not None:
+            query[field] = value
+    if selection.status is not None:
+        query["status"] = selection.status.value
+    return query
+
+
+# What counters, rollups, uptime, the search index and events read from a pre-image.
+_PRE_IMAGE_FIELDS = ["status", "province", "district", "palika", "looma.version", "updatedAt", "revision", *SEARCH_FIELDS]
+
+
+async def _matching_schools(query: Dict[str, Any], extra_fields: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    projection = dict.fromkeys([*_PRE_IMAGE_FIELDS, *extra_fields], 1)
+    return await School.get_pymongo_collection().find(query, projection).to_list()
+
+
+def _unchanged_since(query: Dict[str, Any], school_ids: List[ObjectId], read_time: datetime) -> Dict[str, Any]:
+    # Every write sets updatedAt, so this skips schools written by someone
+    # else after the pre-images were read rather than recording stale images.
+    return {**query, "_id": {"$in": school_ids}, "updatedAt": {"$not": {"$gt": read_time}}}
+
+
+async def bulk_update_schools(
+    selection: SchoolBulkFilter, patch: SchoolBulkPatch, dry_run: bool = False
+) -> Tuple[SchoolBulkResult, List[ObjectId]]:
+    """Apply `patch` to every school matching `selection` with one update_many."""
+    collection = School.get_pymongo_collection()
+    query = bulk_filter(selection)
+    if dry_run:
+        return SchoolBulkResult(matched=await collection.count_documents(query), dry_run=True), []
+
+    fields = patch.model_dump(exclude_unset=True)
+    if "status" in fields:
+        fields["status"] = fields["status"].value
+
+    read_time = now_utc()
+    before = await _matching_schools(query, fields)
+    if not before:
+        return SchoolBulkResult(), []
+    school_ids = [doc["_id"] for doc in before]
+    fields["updatedAt"] = now_utc()
+
+    result = await collection.update_many(
+        _unchanged_since(query, school_ids, read_time), {"$set": fields, "$inc": {"revision": 1}}
+    )
+    if result.matched_count < len(before):
+        # Some were written by someone else first; record only the ones this update reached.
+        updated = {doc["_id"] async for doc in collection.find(
+            {"_id": {"$in": school_ids}, "updatedAt": fields["updatedAt"]}, {"_id": 1}
+        )}
+        before = [doc for doc in before if doc["_id"] in updated]
+        school_ids = [doc["_id"] for doc in before]
+
+    await record_school_changes([
+        SchoolChange(doc, apply_set(doc, {**fields, "revision": (doc.get("revision") or 0) + 1}))
+        for doc in before
+    ])
+    return SchoolBulkResult(matched=result.matched_count, modified=result.modified_count), school_ids
+
+
+async def bulk_delete_schools(selection: SchoolBulkFilter, dry_run: bool = False) -> Tuple[SchoolBulkResult, List[ObjectId]]:
+    """Delete every school matching `selection` with one delete_many."""
+    collection = School.get_pymongo_collection()
+    query = bulk_filter(selection)
+    if dry_run:
+        return SchoolBulkResult(matched=await collection.count_documents(query), dry_run=True), []
+
+    read_time = now_utc()
+    before = await _matching_schools(query)
+    if not before:
+        return SchoolBulkResult(), []
+    school_ids = [doc["_id"] for doc in before]
+
+    result = await collection.delete_many(_unchanged_since(query, school_ids, read_time))
+    if result.deleted_count < len(before):
+        # Schools still there were changed first and skipped; the rest are gone.
+        remaining = {doc["_id"] async for doc in collection.find({"_id": {"$in": school_ids}}, {"_id": 1})}
+        before = [doc for doc in before if doc["_id"] not in remaining]
+
+    await record_school_changes([SchoolChange(doc, None) for doc in before])
+    if len(before) > result.deleted_count:
+        # Another delete removed some of them too and recorded them as well;
+        # which ones can't be told apart, so recount from the collection.
+        logger.warning(f"{len(before) - result.deleted_count} schools were deleted concurrently; reconciling counters and rollups")
+        await _reconcile_derived_data()
+    return SchoolBulkResult(matched=len(school_ids), modified=result.deleted_count), [doc["_id"] for doc in before]
+
+
+async def _reconcile_derived_data():
+    if settings.SCHOOL_STATS_COUNTERS:
+        await reconcile_school_counters()
+    if settings.SCHOOL_ROLLUPS_MATERIALISED:
+        await rebuild_school_rollups()
@@ -0,0 +1,30 @@
+from typing import Any, Dict, NamedTuple
+
+from app.models.school import School
+
+SchoolSnapshot = Dict[str, Any]
+
+
+class SchoolChange(NamedTuple):
+    """A single school write, as raw document images (None = did not exist)."""
+
+    before: SchoolSnapshot | None
+    after: SchoolSnapshot | None
+
+
+def school_snapshot(school: School) -> SchoolSnapshot:
+    return school.model_dump(by_alias=True)
+
+
+def apply_set(doc: SchoolSnapshot, fields: Dict[str, Any]) -> SchoolSnapshot:
+    """`doc` as it reads after a `$set` of `fields` (dotted paths allowed), without mutating it."""
+    after = dict(doc)
+    for path, value in fields.items():
+        *parents, leaf = path.split(".")
+        target = after
+        for key in parents:
+            child = target.get(key)
+            target[key] = dict(child) if isinstance(child, dict) else {}
+            target = target[key]
+        target[leaf] = value
+    return after
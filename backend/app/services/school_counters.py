@@ -0,0 +1,79 @@
+from collections import Counter
+from typing import Dict, List
+
+from app.core.config import settings
+from app.db.mongodb import get_db, routed_reads
+from app.models.school import School
+from app.schemas.school import SchoolStatus
+from app.services.school_changes import SchoolChange, SchoolSnapshot
+
+COUNTERS_COLLECTION = "counters"
+SCHOOL_COUNTERS_ID = "school_stats"
+
+STATUSES = [s.value for s in SchoolStatus]
+
+
+def _empty_stats() -> Dict[str, int]:
+    return {"total": 0, **{s: 0 for s in STATUSES}}
+
+
+def status_of(doc: SchoolSnapshot) -> str | None:
+    try:
+        return SchoolStatus(doc.get("status")).value
+    except ValueError:
+        return None
+
+
+async def aggregate_school_stats(routed: bool = False) -> Dict[str, int]:
+    # Only reads served to clients may be routed; reconciling must count the primary.
+    collection = School.get_pymongo_collection()
+    if routed:
+        collection = routed_reads(collection)
+    cursor = await collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+    groups = await cursor.to_list()
+    stats = _empty_stats()
+    for group in groups:
+        stats["total"] += group["count"]
+        if group["_id"] in stats and group["_id"] != "total":
+            stats[group["_id"]] = group["count"]
+    return stats
+
+
+async def read_school_counters() -> Dict[str, int] | None:
+    doc = await routed_reads(get_db()[COUNTERS_COLLECTION]).find_one({"_id": SCHOOL_COUNTERS_ID})
+    if doc is None:
+        return None
+    stats = _empty_stats()
+    for key in stats:
+        stats[key] = doc.get(key, 0)
+    return stats
+
+
+async def reconcile_school_counters() -> Dict[str, int]:
+    stats = await aggregate_school_stats()
+    await get_db()[COUNTERS_COLLECTION].replace_one({"_id": SCHOOL_COUNTERS_ID}, stats, upsert=True)
+    return stats
+
+
+def counter_deltas(changes: List[SchoolChange]) -> Dict[str, int]:
+    deltas: Counter = Counter()
+    for change in changes:
+        for doc, sign in ((change.before, -1), (change.after, 1)):
+            if doc is None:
+                continue
+            deltas["total"] += sign
+            status = status_of(doc)
+            if status is not None:
+                deltas[status] += sign
+    return {key: value for key, value in deltas.items() if value}
+
+
+async def apply_school_counter_changes(changes: List[SchoolChange]):
+    if not settings.SCHOOL_STATS_COUNTERS:
+        return
+    deltas = counter_deltas(changes)
+    if not deltas:
+        return
+    # No upsert: a missing document is rebuilt in full by the next stats read,
+    # while a partially incremented one would be silently wrong.
+    await get_db()[COUNTERS_COLLECTION].update_one({"_id": SCHOOL_COUNTERS_ID}, {"$inc": deltas})
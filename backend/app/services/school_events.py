@@ -0,0 +1,172 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Set
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.school import School
+from app.services.school_changes import SchoolChange, apply_set
+
+logger = get_logger(__name__)
+
+SchoolEvent = Dict[str, Any]
+
+# Bookkeeping fields that would turn every write into a visible diff.
+_HIDDEN_FIELDS = {"_id", "createdAt", "updatedAt", "revision", "location"}
+
+
+def _diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    # Nested objects carry only their changed subfields, the way the change
+    # stream reports dotted updates, so both sources send the same patches.
+    changed: Dict[str, Any] = {}
+    for key, value in after.items():
+        old = before.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = _diff(old, value)
+            if nested:
+                changed[key] = nested
+        elif old != value:
+            changed[key] = value
+    changed.update({key: None for key in before if key not in after})
+    return changed
+
+
+def merge_patch(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_patch(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def school_event(change: SchoolChange) -> SchoolEvent | None:
+    """Compact diff for one change: only the fields a dashboard needs to patch its copy.
+
+    `changes` is a merge patch: nested objects only hold the subfields that
+    changed, and null marks a removed field.
+    """
+    if change.after is None:
+        if change.before is None:
+            return None
+        return {"type": "delete", "id": str(change.before["_id"])}
+
+    after = {key: value for key, value in change.after.items() if key not in _HIDDEN_FIELDS}
+    if change.before is None:
+        return {"type": "upsert", "id": str(change.after["_id"]), "changes": after}
+
+    before = {key: value for key, value in change.before.items() if key not in _HIDDEN_FIELDS}
+    changed = _diff(before, after)
+    if not changed:
+        return None
+    return {"type": "upsert", "id": str(change.after["_id"]), "changes": changed}
+
+
+class Subscriber:
+    """Bounded per-client queue that coalesces events for the same school.
+
+    A client that falls more than `max_pending` distinct schools behind is
+    marked dropped and should reload the full list.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.dropped = False
+        self._pending: OrderedDict[str, SchoolEvent] = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def push(self, event: SchoolEvent):
+        if self.dropped:
+            return
+        current = self._pending.get(event["id"])
+        if current is not None:
+            if event["type"] == "upsert" and current["type"] == "upsert":
+                # A new dict: the events themselves are shared with other subscribers.
+                self._pending[event["id"]] = {**current, "changes": merge_patch(current["changes"], event["changes"])}
+            else:
+                self._pending[event["id"]] = event
+        elif len(self._pending) >= self.max_pending:
+            self.dropped = True
+            self._pending.clear()
+        else:
+            self._pending[event["id"]] = event
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> List[SchoolEvent]:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class SchoolEventBroker:
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(settings.SCHOOL_EVENTS_MAX_PENDING)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, events: List[SchoolEvent]):
+        for subscriber in self._subscribers:
+            for event in events:
+                subscriber.push(event)
+
+
+school_event_broker = SchoolEventBroker()
+
+
+def publish_school_changes(changes: List[SchoolChange]):
+    # In change-stream mode every write (from any worker) arrives through
+    # run_school_change_stream instead, so local publishing would duplicate it.
+    if settings.SCHOOL_EVENTS_SOURCE != "local" or not len(school_event_broker):
+        return
+    events = [event for event in map(school_event, changes) if event is not None]
+    if events:
+        school_event_broker.publish(events)
+
+
+def _change_stream_event(change: Dict[str, Any]) -> SchoolEvent | None:
+    operation = change.get("operationType")
+    school_id = str(change.get("documentKey", {}).get("_id"))
+    if operation == "delete":
+        return {"type": "delete", "id": school_id}
+    if operation in ("insert", "replace") and change.get("fullDocument"):
+        return school_event(SchoolChange(None, change["fullDocument"]))
+    if operation == "update":
+        description = change.get("updateDescription", {})
+        fields = {**description.get("updatedFields", {}), **dict.fromkeys(description.get("removedFields", []))}
+        # Dotted paths ("contact.email") become nested objects, as in locally published diffs.
+        changes = apply_set({}, {key: value for key, value in fields.items() if key.split(".")[0] not in _HIDDEN_FIELDS})
+        return {"type": "upsert", "id": school_id, "changes": changes} if changes else None
+    return None
+
+
+async def run_school_change_stream():
+    """Feed the broker from a MongoDB change stream (requires a replica set)."""
+    resume_token = None
+    while True:
+        try:
+            async with await School.get_pymongo_collection().watch(resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event = _change_stream_event(change)
+                    if event is not None and len(school_event_broker):
+                        school_event_broker.publish([event])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"School change stream failed, retrying: {e}")
+            await asyncio.sleep(5)
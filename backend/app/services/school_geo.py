@@ -0,0 +1,88 @@
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.models.school import School
+from app.schemas.school import SchoolCluster, SchoolClusters
+from app.services.school_counters import STATUSES
+from app.services.school_serialization import SCHOOL_FIELDS, SchoolFieldSet, SchoolOutDict, school_out_dict
+
+
+def _within_filter(min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> Dict[str, Any]:
+    # Planar ranges over the stored coordinates: a map viewport's edges follow
+    # lines of latitude, which geodesic polygon edges don't, and any size of
+    # box is valid (a world-sized $geometry polygon is rejected by Mongo).
+    # Coordinates out of range have no location, so `location` keeps them out.
+    return {
+        "longitude": {"$gte": min_lng, "$lte": max_lng},
+        "latitude": {"$gte": min_lat, "$lte": max_lat},
+        "location": {"$ne": None},
+    }
+
+
+async def schools_within(
+    min_lng: float, min_lat: float, max_lng: float, max_lat: float, limit: int, fields: SchoolFieldSet = SCHOOL_FIELDS
+) -> List[SchoolOutDict]:
+    query = _within_filter(min_lng, min_lat, max_lng, max_lat)
+    cursor = School.get_pymongo_collection().find(query, fields.projection).limit(limit)
+    return [school_out_dict(doc, fields) async for doc in cursor]
+
+
+async def schools_near(
+    longitude: float, latitude: float, max_distance_m: float | None, limit: int, fields: SchoolFieldSet = SCHOOL_FIELDS
+) -> List[SchoolOutDict]:
+    near: Dict[str, Any] = {"$geometry": {"type": "Point", "coordinates": [longitude, latitude]}}
+    if max_distance_m is not None:
+        near["$maxDistance"] = max_distance_m
+    # $near returns documents sorted by distance, nearest first.
+    cursor = School.get_pymongo_collection().find({"location": {"$near": near}}, fields.projection).limit(limit)
+    return [school_out_dict(doc, fields) async for doc in cursor]
+
+
+def cluster_cell_degrees(zoom: int) -> float:
+    # Web-map tiles are 360 / 2^zoom degrees wide; split each into a grid of
+    # GEO_CLUSTER_CELLS_PER_TILE cells so markers don't overlap on screen.
+    return 360 / (2 ** zoom) / settings.GEO_CLUSTER_CELLS_PER_TILE
+
+
+async def school_clusters(
+    zoom: int,
+    min_lng: float | None = None,
+    min_lat: float | None = None,
+    max_lng: float | None = None,
+    max_lat: float | None = None,
+) -> SchoolClusters:
+    cell = cluster_cell_degrees(zoom)
+    match: Dict[str, Any] = {"location": {"$ne": None}}
+    if None not in (min_lng, min_lat, max_lng, max_lat):
+        match = _within_filter(min_lng, min_lat, max_lng, max_lat)
+
+    group: Dict[str, Any] = {
+        "_id": {
+            "x": {"$floor": {"$divide": ["$longitude", cell]}},
+            "y": {"$floor": {"$divide": ["$latitude", cell]}},
+        },
+        "count": {"$sum": 1},
+        "latitude": {"$avg": "$latitude"},
+        "longitude": {"$avg": "$longitude"},
+        "schoolId": {"$first": "$_id"},
+    }
+    for status in STATUSES:
+        group[status] = {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+
+    # One extra group tells a cut-off result from one that just fits.
+    groups = await School.aggregate(
+        [{"$match": match}, {"$group": group}, {"$limit": settings.GEO_MAX_CLUSTERS + 1}]
+    ).to_list()
+    truncated = len(groups) > settings.GEO_MAX_CLUSTERS
+
+    clusters = [
+        SchoolCluster(
+            latitude=g["latitude"],
+            longitude=g["longitude"],
+            count=g["count"],
+            statuses={status: g[status] for status in STATUSES},
+            schoolId=g["schoolId"] if g["count"] == 1 else None,
+        )
+        for g in groups[:settings.GEO_MAX_CLUSTERS]
+    ]
+    return SchoolClusters(clusters=clusters, truncated=truncated)
@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.models.school import School
+from app.schemas.school import SchoolCreate, SchoolImportResult
+from app.services.school_changes import SchoolChange
+from app.services.schools import record_school_changes
+from app.utils.dates import now_utc
+from app.utils.geo import geo_point
+
+Row = Tuple[int, Dict[str, Any] | None, str | None]
+
+DUPLICATE_KEY = 11000
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _unflatten(row: Dict[str, str]) -> Dict[str, Any]:
+    nested: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None or value is None or value.strip() == "":
+            continue
+        target = nested
+        *parents, leaf = key.strip().split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value.strip()
+    return nested
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Row]:
+    """Yield (row number, row, error) for a CSV upload with dotted headers.
+
+    Headers follow the document shape, e.g. `contact.email` or `looma.version`.
+    A record is only parsed once its quotes balance, so quoted fields may
+    contain newlines.
+    """
+    header: List[str] | None = None
+    record = ""
+    row_number = 0
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        fields = next(csv.reader([text]))
+        if header is None:
+            header = fields
+            continue
+        row_number += 1
+        if len(fields) != len(header):
+            yield row_number, None, f"expected {len(header)} columns, got {len(fields)}"
+            continue
+        yield row_number, _unflatten(dict(zip(header, fields))), None
+    if record.strip():
+        yield row_number + 1, None, "unterminated quoted field"
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Row]:
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "expected a JSON object"
+            continue
+        yield row_number, row, None
+
+
+def _school_fields(school: SchoolCreate) -> Dict[str, Any]:
+    fields = school.model_dump()
+    fields["status"] = school.status.value
+    fields["location"] = geo_point(school.latitude, school.longitude)
+    return fields
+
+
+class _ImportReport:
+    def __init__(self):
+        self.result = SchoolImportResult()
+
+    def error(self, row: int, detail: Any):
+        self.result.failed += 1
+        if len(self.result.errors) < settings.SCHOOL_IMPORT_MAX_ERRORS:
+            self.result.errors.append({"row": row, "detail": detail})
+        else:
+            self.result.errors_truncated += 1
+
+
+async def _write_batch(batch: Dict[str, Tuple[int, SchoolCreate]], report: _ImportReport):
+    collection = School.get_pymongo_collection()
+    now = now_utc()
+
+    # One read per batch gives us the pre-images needed by counters and the
+    # search index; it costs the same whether the batch has 1 row or 1,000.
+    loomaIds = list(batch)
+    existing = {
+        doc["loomaId"]: doc
+        async for doc in collection.find({"loomaId": {"$in": loomaIds}})
+    }
+
+    ops = []
+    for loomaId in loomaIds:
+        _, school = batch[loomaId]
+        ops.append(
+            UpdateOne(
+                {"loomaId": loomaId},
+                {"$set": {**_school_fields(school), "updatedAt": now}, "$setOnInsert": {"createdAt": now}, "$inc": {"revision": 1}},
+                upsert=True,
+            )
+        )
+
+    failed_indexes = set()
+    try:
+        result = await collection.bulk_write(ops, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for write_error in details.get("writeErrors", []):
+            failed_indexes.add(write_error["index"])
+            detail = write_error.get("errmsg", "write failed")
+            if write_error.get("code") == DUPLICATE_KEY:
+                detail = "another write created a school with this loomaId at the same time; import the row again"
+            report.error(batch[loomaIds[write_error["index"]]][0], detail)
+
+    report.result.upserted += details.get("nUpserted", 0)
+    report.result.matched += details.get("nMatched", 0)
+    report.result.modified += details.get("nModified", 0)
+
+    upserted_ids = {entry["index"]: entry["_id"] for entry in details.get("upserted", [])}
+    changes: List[SchoolChange] = []
+    for i, loomaId in enumerate(loomaIds):
+        if i in failed_indexes:
+            continue
+        fields = _school_fields(batch[loomaId][1])
+        before = existing.get(loomaId)
+        if before is not None:
+            revision = (before.get("revision") or 0) + 1
+            changes.append(SchoolChange(before, {**before, **fields, "updatedAt": now, "revision": revision}))
+        elif i in upserted_ids:
+            changes.append(SchoolChange(None, {"_id": upserted_ids[i], **fields, "createdAt": now, "updatedAt": now, "revision": 1}))
+    await record_school_changes(changes)
+
+
+async def import_schools(rows: AsyncIterator[Row], batch_size: int) -> SchoolImportResult:
+    """Validate rows as they arrive and upsert them by loomaId in batches.
+
+    Only one batch is held in memory at a time; invalid rows are reported
+    and skipped without affecting the rest of their batch.
+    """
+    report = _ImportReport()
+    batch: Dict[str, Tuple[int, SchoolCreate]] = {}
+
+    async for row_number, row, error in rows:
+        report.result.received += 1
+        if error is not None:
+            report.error(row_number, error)
+            continue
+        try:
+            school = SchoolCreate.model_validate(row)
+        except ValidationError as e:
+            report.error(row_number, e.errors(include_url=False, include_context=False, include_input=False))
+            continue
+
+        if school.loomaId in batch:
+            # The later row wins; the earlier one isn't an error.
+            report.result.superseded += 1
+        batch[school.loomaId] = (row_number, school)
+
+        if len(batch) >= batch_size:
+            await _write_batch(batch, report)
+            batch = {}
+
+    if batch:
+        await _write_batch(batch, report)
+
+    return report.result
@@ -0,0 +1,236 @@
+import json
+import os
+import socket
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.indexes import create_collection_indexes
+from app.db.mongodb import get_db
+from app.models.school import School
+from app.schemas.school import RollupLevel, RollupNode
+from app.services.leases import acquire_lease, release_lease
+from app.services.school_changes import SchoolChange, SchoolSnapshot
+from app.services.school_counters import COUNTERS_COLLECTION, STATUSES, status_of
+
+logger = get_logger(__name__)
+
+ROLLUPS_COLLECTION = "school_rollups"
+ROLLUPS_META_ID = "__meta__"
+ROLLUPS_REBUILD_LEASE = "school_rollups_rebuild"
+ROLLUPS_REBUILD_LEASE_SECONDS = 600
+ROLLUPS_REBUILD_ATTEMPTS = 3
+# counters document bumped before every rollup increment
+ROLLUPS_WRITES_ID = "school_rollup_writes"
+# unique per worker process, also across hosts
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+
+LEVELS = [RollupLevel.PROVINCE, RollupLevel.DISTRICT, RollupLevel.PALIKA]
+
+NodeKey = Tuple[str, ...]
+
+
+def _encode_key(name: str) -> str:
+    # Version strings ("2.1.0") can't be used verbatim as Mongo field names.
+    return name.replace("$", "＄").replace(".", "．")
+
+
+def _decode_key(name: str) -> str:
+    return name.replace("＄", "$").replace("．", ".")
+
+
+def _node_id(path: NodeKey) -> str:
+    return json.dumps(list(path), ensure_ascii=False)
+
+
+def _paths(province: str, district: str, palika: str) -> List[NodeKey]:
+    return [(province,), (province, district), (province, district, palika)]
+
+
+def _node_fields(path: NodeKey) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {"level": LEVELS[len(path) - 1].value}
+    for level, name in zip(LEVELS, path):
+        fields[level.value] = name
+    return fields
+
+
+def _image_counts(doc: SchoolSnapshot) -> Counter:
+    counts: Counter = Counter({"total": 1})
+    status = status_of(doc)
+    if status is not None:
+        counts[f"statuses.{status}"] += 1
+    version = (doc.get("looma") or {}).get("version")
+    if version:
+        counts[f"versions.{_encode_key(version)}"] += 1
+    return counts
+
+
+def rollup_deltas(changes: Iterable[SchoolChange]) -> Dict[NodeKey, Counter]:
+    deltas: Dict[NodeKey, Counter] = defaultdict(Counter)
+    for change in changes:
+        for doc, sign in ((change.before, -1), (change.after, 1)):
+            if doc is None:
+                continue
+            counts = _image_counts(doc)
+            for path in _paths(doc.get("province", ""), doc.get("district", ""), doc.get("palika", "")):
+                for field, value in counts.items():
+                    deltas[path][field] += sign * value
+    return {path: Counter({k: v for k, v in counter.items() if v}) for path, counter in deltas.items() if any(counter.values())}
+
+
+async def apply_school_rollup_changes(changes: List[SchoolChange]):
+    if not settings.SCHOOL_ROLLUPS_MATERIALISED:
+        return
+    deltas = rollup_deltas(changes)
+    if not deltas:
+        return
+    ops = [
+        UpdateOne({"_id": _node_id(path)}, {"$inc": dict(counter), "$setOnInsert": _node_fields(path)}, upsert=True)
+        for path, counter in deltas.items()
+    ]
+    # Before the increments, so a rebuild that swaps the collection under
+    # them always sees the count move and runs again.
+    await get_db()[COUNTERS_COLLECTION].update_one({"_id": ROLLUPS_WRITES_ID}, {"$inc": {"v": 1}}, upsert=True)
+    await get_db()[ROLLUPS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def _rollup_writes() -> int:
+    doc = await get_db()[COUNTERS_COLLECTION].find_one({"_id": ROLLUPS_WRITES_ID})
+    return doc["v"] if doc else 0
+
+
+def _scope_match(province: str | None, district: str | None) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if province is not None:
+        match["province"] = province
+        if district is not None:
+            match["district"] = district
+    return match
+
+
+def rollup_level(province: str | None, district: str | None) -> RollupLevel:
+    if province is None:
+        return RollupLevel.PROVINCE
+    if district is None:
+        return RollupLevel.DISTRICT
+    return RollupLevel.PALIKA
+
+
+async def aggregate_school_rollups(province: str | None = None, district: str | None = None) -> List[RollupNode]:
+    """One aggregation over the (province, district, palika, status, looma.version) index."""
+    level = rollup_level(province, district)
+    groups = await School.aggregate([
+        {"$match": _scope_match(province, district)},
+        {"$group": {
+            "_id": {"name": f"${level.value}", "status": "$status", "version": "$looma.version"},
+            "count": {"$sum": 1},
+        }},
+    ]).to_list()
+
+    nodes: Dict[str, RollupNode] = {}
+    for group in groups:
+        key = group["_id"]
+        node = nodes.setdefault(key.get("name") or "", RollupNode(name=key.get("name") or "", level=level))
+        node.total += group["count"]
+        if key.get("status") in STATUSES:
+            node.statuses[key["status"]] = node.statuses.get(key["status"], 0) + group["count"]
+        if key.get("version"):
+            node.versions[key["version"]] = node.versions.get(key["version"], 0) + group["count"]
+    return sorted(nodes.values(), key=lambda node: node.name)
+
+
+def _node_from_doc(doc: Dict[str, Any]) -> RollupNode:
+    level = RollupLevel(doc["level"])
+    return RollupNode(
+        name=doc[level.value],
+        level=level,
+        total=doc.get("total", 0),
+        statuses={status: count for status, count in doc.get("statuses", {}).items() if count},
+        versions={_decode_key(version): count for version, count in doc.get("versions", {}).items() if count},
+    )
+
+
+async def _rollup_docs() -> List[Dict[str, Any]]:
+    groups = await School.aggregate([
+        {"$group": {
+            "_id": {
+                "province": "$province",
+                "district": "$district",
+                "palika": "$palika",
+                "status": "$status",
+                "version": "$looma.version",
+            },
+            "count": {"$sum": 1},
+        }},
+    ]).to_list()
+
+    nodes: Dict[NodeKey, Counter] = defaultdict(Counter)
+    for group in groups:
+        key = group["_id"]
+        image = {"status": key.get("status"), "looma": {"version": key.get("version")}}
+        counts = _image_counts(image)
+        for path in _paths(key.get("province") or "", key.get("district") or "", key.get("palika") or ""):
+            for field, value in counts.items():
+                nodes[path][field] += value * group["count"]
+
+    docs = []
+    for path, counter in nodes.items():
+        doc: Dict[str, Any] = {"_id": _node_id(path), **_node_fields(path), "statuses": {}, "versions": {}}
+        for field, value in counter.items():
+            if "." in field:
+                group_name, name = field.split(".", 1)
+                doc[group_name][name] = value
+            else:
+                doc[field] = value
+        docs.append(doc)
+    return docs
+
+
+async def rebuild_school_rollups() -> int | None:
+    """Rebuild the rollups from the schools collection; None if another worker is rebuilding.
+
+    The new documents are written to a staging collection that is renamed over
+    the live one, so readers never see a partial set. Increments landing
+    during the rebuild move the rollup write count; the rebuild then runs
+    again so they aren't lost with the old collection.
+    """
+    if not await acquire_lease(ROLLUPS_REBUILD_LEASE, _owner, ROLLUPS_REBUILD_LEASE_SECONDS):
+        return None
+    database = get_db()
+    staging = f"{ROLLUPS_COLLECTION}_rebuild"
+    try:
+        for _ in range(ROLLUPS_REBUILD_ATTEMPTS):
+            writes = await _rollup_writes()
+            docs = await _rollup_docs()
+            await database.drop_collection(staging)
+            await create_collection_indexes(database, ROLLUPS_COLLECTION, staging)
+            if docs:
+                await database[staging].insert_many(docs, ordered=False)
+            await database[staging].insert_one({"_id": ROLLUPS_META_ID, "built": True})
+            await database[staging].rename(ROLLUPS_COLLECTION, dropTarget=True)
+            if await _rollup_writes() == writes:
+                break
+        else:
+            logger.warning("Schools kept changing during the rollup rebuild; some counts may be off until the next one")
+        return len(docs)
+    finally:
+        await release_lease(ROLLUPS_REBUILD_LEASE, _owner)
+
+
+async def get_school_rollups(province: str | None = None, district: str | None = None) -> List[RollupNode]:
+    if not settings.SCHOOL_ROLLUPS_MATERIALISED:
+        return await aggregate_school_rollups(province, district)
+
+    collection = get_db()[ROLLUPS_COLLECTION]
+    if await collection.find_one({"_id": ROLLUPS_META_ID}) is None:
+        if await rebuild_school_rollups() is None:
+            # Another worker is building them; answer from the schools collection meanwhile.
+            return await aggregate_school_rollups(province, district)
+
+    level = rollup_level(province, district)
+    query = {"level": level.value, **_scope_match(province, district)}
+    docs = await collection.find(query).sort(level.value, 1).to_list()
+    return [node for node in map(_node_from_doc, docs) if node.total > 0]
@@ -0,0 +1,117 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from app.core.exceptions import InvalidFields
+from app.schemas.school import Contact, LoomaInfo, SchoolOut
+
+SchoolOutDict = Dict[str, Any]
+
+_NESTED_FIELDS = {"contact": Contact, "looma": LoomaInfo}
+# Filled from the qr_scans and access_logs collections, not the school document.
+ACTIVITY_FIELDS = {"qrScans", "accessLogs", "qrScanCount", "accessLogCount"}
+_ACTIVITY_LISTS = ("qrScans", "accessLogs")
+_ACTIVITY_COUNTS = ("qrScanCount", "accessLogCount")
+
+# Top-level SchoolOut fields stored on the school document.
+SCHOOL_OUT_FIELDS = [field for field in SchoolOut.model_fields if field != "id" and field not in ACTIVITY_FIELDS]
+
+
+class SchoolFieldSet(NamedTuple):
+    """A compiled `fields=` selection: what to project in Mongo and what to emit."""
+
+    stored: Tuple[str, ...] # read from the school document, in SchoolOut order
+    activity: Tuple[str, ...] # filled from the activity collections
+    projection: Dict[str, int]
+
+    @property
+    def counts(self) -> bool:
+        """Whether the selection needs the activity count aggregation."""
+        return any(field in _ACTIVITY_COUNTS for field in self.activity)
+
+
+def _compile(names: Iterable[str]) -> SchoolFieldSet:
+    wanted = set(names)
+    stored = tuple(field for field in SCHOOL_OUT_FIELDS if field in wanted)
+    activity = tuple(field for field in SchoolOut.model_fields if field in ACTIVITY_FIELDS and field in wanted)
+
+    projection: Dict[str, int] = {}
+    for field in stored:
+        if field in _NESTED_FIELDS:
+            for subfield in _NESTED_FIELDS[field].model_fields:
+                projection[f"{field}.{subfield}"] = 1
+        else:
+            projection[field] = 1
+    # An empty projection would return whole documents.
+    return SchoolFieldSet(stored, activity, projection or {"_id": 1})
+
+
+# Lists leave the counts out unless asked for (`activity=true` or `fields=`):
+# they cost an aggregation over both activity collections, and tie the
+# list ETags to every activity flush.
+SCHOOL_FIELDS = _compile(field for field in SchoolOut.model_fields if field not in _ACTIVITY_COUNTS)
+# GET /schools/{id} embeds the counts by default.
+SCHOOL_DETAIL_FIELDS = _compile(SchoolOut.model_fields)
+
+# Compiled once; `fields=map` is what the map view sends.
+SCHOOL_FIELD_PRESETS: Dict[str, SchoolFieldSet] = {
+    "map": _compile(("name", "latitude", "longitude", "status", "province")),
+    "table": _compile(("name", "province", "district", "palika", "status", "lastSeen", "loomaId", "loomaCount")),
+}
+
+
+@lru_cache(maxsize=256)
+def _compile_names(names: Tuple[str, ...]) -> SchoolFieldSet:
+    expanded: List[str] = []
+    for name in names:
+        preset = SCHOOL_FIELD_PRESETS.get(name)
+        if preset is not None:
+            expanded += preset.stored + preset.activity
+        elif name in SchoolOut.model_fields:
+            expanded.append(name)
+        else:
+            raise InvalidFields(name)
+    return _compile(expanded)
+
+
+def parse_school_fields(value: str | None, default: SchoolFieldSet = SCHOOL_FIELDS) -> SchoolFieldSet:
+    """`fields=` as a comma-separated list of SchoolOut fields and preset names."""
+    if value is None:
+        return default
+    preset = SCHOOL_FIELD_PRESETS.get(value)
+    if preset is not None:
+        return preset
+    return _compile_names(tuple(sorted({name.strip() for name in value.split(",") if name.strip()})))
+
+
+def school_out_dict(doc: Dict[str, Any], fields: SchoolFieldSet = SCHOOL_FIELDS) -> SchoolOutDict:
+    """SchoolOut-shaped dict straight from a raw document, without validation.
+
+    Documents are validated when they are written, so reads only reshape.
+    With a sparse `fields`, only the selected fields (and id) are emitted.
+    """
+    out: SchoolOutDict = {"id": doc["_id"]}
+    for field in fields.stored:
+        out[field] = doc.get(field)
+    if out.get("revision", 0) is None:
+        # written before schools had revisions
+        out["revision"] = 0
+    for field in fields.activity:
+        if field in _ACTIVITY_LISTS:
+            out[field] = []
+    return out
+
+
+def dump_json(value: Any) -> bytes:
+    # pydantic-core's Rust encoder: datetimes as ISO 8601, ObjectIds via str().
+    return to_json(value, fallback=str)
+
+
+def json_response(value: Any, headers: Dict[str, str] | None = None, status_code: int = 200) -> Response:
+    return Response(content=dump_json(value), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def dump_schools(docs: Iterable[Dict[str, Any]], fields: SchoolFieldSet = SCHOOL_FIELDS) -> List[SchoolOutDict]:
+    return [school_out_dict(doc, fields) for doc in docs]
@@ -0,0 +1,276 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Literal, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import get_db
+from app.models.school import School
+from app.models.school_uptime import SchoolUptimeDoc
+from app.models.status_transition import StatusTransitionDoc
+from app.services.school_changes import SchoolChange
+from app.services.school_counters import STATUSES, status_of
+from app.utils.dates import now_utc
+
+# One document per school: its current status and since when.
+STATE_COLLECTION = "school_status_state"
+
+Period = Literal["day", "week"]
+PERIODS: List[Period] = ["day", "week"]
+PERIOD_LENGTH = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+
+def _aware(value: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def period_start(value: datetime, period: Period) -> datetime:
+    """Start of the UTC day, or of the ISO week (Monday), containing `value`."""
+    start = datetime.combine(value.astimezone(timezone.utc).date(), time(), timezone.utc)
+    if period == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def split_interval(start: datetime, end: datetime, period: Period) -> Iterator[Tuple[datetime, float]]:
+    """(bucket start, seconds) for each day or week that [start, end) overlaps."""
+    bucket = period_start(start, period)
+    while bucket < end:
+        bucket_end = bucket + PERIOD_LENGTH[period]
+        seconds = (min(end, bucket_end) - max(start, bucket)).total_seconds()
+        if seconds > 0:
+            yield bucket, seconds
+        bucket = bucket_end
+
+
+def status_transitions(changes: List[SchoolChange]) -> List[Tuple[ObjectId, str | None, str | None, str | None]]:
+    """(school id, previous, status, province) for each change that moved a school's status."""
+    transitions = []
+    for change in changes:
+        previous = status_of(change.before) if change.before is not None else None
+        current = status_of(change.after) if change.after is not None else None
+        if previous != current:
+            doc = change.after if change.after is not None else change.before
+            transitions.append((doc["_id"], previous, current, doc.get("province")))
+    return transitions
+
+
+def province_moves(changes: List[SchoolChange]) -> List[Tuple[ObjectId, str | None]]:
+    """(school id, province) for schools that moved province without changing status."""
+    return [
+        (change.after["_id"], change.after.get("province"))
+        for change in changes
+        if change.before is not None and change.after is not None
+        and status_of(change.before) == status_of(change.after)
+        and change.before.get("province") != change.after.get("province")
+    ]
+
+
+def _rollup_ops(school_id: ObjectId, state: Dict[str, Any], end: datetime) -> List[UpdateOne]:
+    ops = []
+    for period in PERIODS:
+        for start, seconds in split_interval(_aware(state["since"]), end, period):
+            ops.append(UpdateOne(
+                {"schoolId": school_id, "period": period, "start": start},
+                {"$inc": {f"seconds.{state['status']}": seconds}, "$set": {"province": state.get("province")}},
+                upsert=True,
+            ))
+    return ops
+
+
+async def _swap_state(states, school_id: ObjectId, current: str | None, province: str | None, now: datetime) -> Dict[str, Any] | None:
+    """Replace the school's open interval and return the one it replaced.
+
+    Atomic per school, so when two writers race, each closes a different
+    interval and no span is credited twice.
+    """
+    if current is None:
+        return await states.find_one_and_delete({"_id": school_id})
+    return await states.find_one_and_update(
+        {"_id": school_id},
+        {"$set": {"status": current, "since": now, "province": province}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+
+
+async def record_status_transitions(changes: List[SchoolChange]):
+    """Append the transitions in `changes` and close each school's previous
+    interval into its daily and weekly rollups.
+
+    Two round trips on the critical path: the history insert runs alongside
+    the per-school interval swaps, then the rollups are written in one batch.
+    """
+    if not settings.SCHOOL_UPTIME_TRACKING:
+        return
+    transitions = status_transitions(changes)
+    moves = province_moves(changes)
+    if not transitions and not moves:
+        return
+
+    states = get_db()[STATE_COLLECTION]
+    if moves:
+        # The open interval is credited to the province the school is in when it closes.
+        await states.bulk_write(
+            [UpdateOne({"_id": school_id}, {"$set": {"province": province}}) for school_id, province in moves],
+            ordered=False,
+        )
+    if not transitions:
+        return
+
+    now = now_utc()
+    history = [
+        {"schoolId": school_id, "timestamp": now, "previous": previous, "status": current, "province": province}
+        for school_id, previous, current, province in transitions
+    ]
+    _, *closed = await asyncio.gather(
+        StatusTransitionDoc.get_pymongo_collection().insert_many(history, ordered=False),
+        *(_swap_state(states, school_id, current, province, now) for school_id, _, current, province in transitions),
+    )
+
+    rollup_ops = []
+    for (school_id, *_), state in zip(transitions, closed):
+        if state is not None and state.get("status") in STATUSES:
+            rollup_ops += _rollup_ops(school_id, state, now)
+    if rollup_ops:
+        await SchoolUptimeDoc.get_pymongo_collection().bulk_write(rollup_ops, ordered=False)
+
+
+async def seed_status_state() -> int:
+    """Open an interval, starting now, for every school that has none."""
+    now = now_utc()
+    states = get_db()[STATE_COLLECTION]
+    tracked = set(await states.distinct("_id"))
+    cursor = School.get_pymongo_collection().find({}, {"status": 1, "province": 1})
+    docs = [
+        {"_id": doc["_id"], "status": status_of(doc), "since": now, "province": doc.get("province")}
+        async for doc in cursor
+        if doc["_id"] not in tracked and status_of(doc) is not None
+    ]
+    if docs:
+        await states.insert_many(docs, ordered=False)
+    return len(docs)
+
+
+def _buckets(start: datetime, end: datetime, granularity: Period) -> List[Tuple[datetime, datetime, datetime]]:
+    """(bucket start, window start, window end) per day or week, clipped to [start, end)."""
+    buckets = []
+    bucket = period_start(start, granularity)
+    while bucket < end:
+        bucket_end = bucket + PERIOD_LENGTH[granularity]
+        buckets.append((bucket, max(bucket, start), min(bucket_end, end)))
+        bucket = bucket_end
+    return buckets
+
+
+def _closed_filter(start: datetime, end: datetime, granularity: Period) -> Dict[str, Any]:
+    if granularity == "day":
+        return {"period": "day", "start": {"$gte": start, "$lt": end}}
+    # Whole weeks come from the weekly rollups; a partial week at either
+    # edge of the range is summed from its daily rollups.
+    whole_weeks = [
+        bucket for bucket, window_start, window_end in _buckets(start, end, "week")
+        if window_start == bucket and window_end == bucket + PERIOD_LENGTH["week"]
+    ]
+    if not whole_weeks:
+        return {"period": "day", "start": {"$gte": start, "$lt": end}}
+    first, last = whole_weeks[0], whole_weeks[-1] + PERIOD_LENGTH["week"]
+    return {"$or": [
+        {"period": "week", "start": {"$gte": first, "$lt": last}},
+        {"period": "day", "start": {"$gte": start, "$lt": first}},
+        {"period": "day", "start": {"$gte": last, "$lt": end}},
+    ]}
+
+
+def _ratio(seconds: Dict[str, float]) -> float | None:
+    # Maintenance is planned downtime, so it counts for neither side.
+    counted = seconds["online"] + seconds["offline"]
+    return seconds["online"] / counted if counted else None
+
+
+async def school_uptime(
+    start: date,
+    end: date,
+    granularity: Period = "day",
+    province: str | None = None,
+    school_id: ObjectId | None = None,
+) -> Dict[str, Any]:
+    """Seconds per status and the uptime ratio for the days `start`..`end`
+    (inclusive, UTC), overall and per day or week.
+
+    Closed intervals come from one aggregation over the rollups; intervals
+    still open are added from one aggregation over the current states, so
+    the schools' history is never rescanned.
+    """
+    range_start = datetime.combine(start, time(), timezone.utc)
+    range_end = min(datetime.combine(end + timedelta(days=1), time(), timezone.utc), now_utc())
+    buckets = _buckets(range_start, range_end, granularity)
+    index = {bucket: i for i, (bucket, _, _) in enumerate(buckets)}
+    series = [dict.fromkeys(STATUSES, 0.0) for _ in buckets]
+
+    owner: Dict[str, Any] = {}
+    if school_id is not None:
+        owner["schoolId"] = school_id
+    elif province is not None:
+        owner["province"] = province
+
+    if buckets:
+        pipeline = [
+            {"$match": {**owner, **_closed_filter(range_start, range_end, granularity)}},
+            {"$group": {"_id": "$start", **{s: {"$sum": f"$seconds.{s}"} for s in STATUSES}}},
+        ]
+        cursor = await SchoolUptimeDoc.get_pymongo_collection().aggregate(pipeline)
+        async for doc in cursor:
+            i = index[period_start(_aware(doc.pop("_id")), granularity)]
+            for status, seconds in doc.items():
+                series[i][status] += seconds
+
+        # Open intervals, grouped by status and the bucket they enter the
+        # range in; each group contributes count * bucket end - sum(entry time)
+        # to that bucket and its full length per school to every later one.
+        state_match = {"since": {"$lt": range_end}}
+        if school_id is not None:
+            state_match["_id"] = school_id
+        elif province is not None:
+            state_match["province"] = province
+        trunc = {"date": "$entered", "unit": granularity, "timezone": "UTC"}
+        if granularity == "week":
+            trunc["startOfWeek"] = "monday"
+        pipeline = [
+            {"$match": state_match},
+            {"$project": {"status": 1, "entered": {"$max": ["$since", range_start]}}},
+            {"$group": {
+                "_id": {"status": "$status", "bucket": {"$dateTrunc": trunc}},
+                "n": {"$sum": 1},
+                "entered_ms": {"$sum": {"$toLong": "$entered"}},
+            }},
+        ]
+        cursor = await get_db()[STATE_COLLECTION].aggregate(pipeline)
+        async for doc in cursor:
+            status = doc["_id"]["status"]
+            if status not in STATUSES:
+                continue
+            first = index[_aware(doc["_id"]["bucket"])]
+            series[first][status] += doc["n"] * buckets[first][2].timestamp() - doc["entered_ms"] / 1000
+            for i in range(first + 1, len(buckets)):
+                _, window_start, window_end = buckets[i]
+                series[i][status] += doc["n"] * (window_end - window_start).total_seconds()
+
+    totals = dict.fromkeys(STATUSES, 0.0)
+    for seconds in series:
+        for status, value in seconds.items():
+            totals[status] += value
+    return {
+        "from": start,
+        "to": end,
+        "granularity": granularity,
+        "seconds": totals,
+        "uptime": _ratio(totals),
+        "series": [
+            {"start": bucket, "seconds": seconds, "uptime": _ratio(seconds)}
+            for (bucket, _, _), seconds in zip(buckets, series)
+        ],
+    }
@@ -0,0 +1,73 @@
+import time
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.db.mongodb import get_db, routed_reads
+from app.services.school_counters import COUNTERS_COLLECTION
+
+SCHOOL_VERSION_ID = "school_version"
+# bumped by every flush of QR scans or access logs
+SCHOOL_ACTIVITY_VERSION_ID = "school_activity_version"
+
+
+class _VersionCounter:
+    """A counters document read through a short-lived per-worker cache.
+
+    Reads are served from memory for SCHOOL_VERSION_TTL_SECONDS, so bumps
+    made by other workers become visible within that window; bumps made by
+    this worker are visible immediately.
+    """
+
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.value: int | None = None
+        self.fetched_at = 0.0
+
+    def _remember(self, value: int):
+        self.value = value
+        self.fetched_at = time.monotonic()
+
+    async def get(self) -> int:
+        if self.value is not None and time.monotonic() - self.fetched_at < settings.SCHOOL_VERSION_TTL_SECONDS:
+            return self.value
+
+        # Same read routing as the list and stats data tagged with this version, so
+        # a lagging secondary is unlikely to pair old data with a newer ETag. The
+        # version never goes backwards, even if that secondary is behind our own writes.
+        doc = await routed_reads(get_db()[COUNTERS_COLLECTION]).find_one({"_id": self.doc_id})
+        value = max(doc["v"] if doc else 0, self.value or 0)
+        self._remember(value)
+        return value
+
+    async def bump(self) -> int:
+        doc = await get_db()[COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": self.doc_id},
+            {"$inc": {"v": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._remember(doc["v"])
+        return doc["v"]
+
+
+_school_version = _VersionCounter(SCHOOL_VERSION_ID)
+_activity_version = _VersionCounter(SCHOOL_ACTIVITY_VERSION_ID)
+
+
+async def get_school_version() -> int:
+    """Version of the schools collection, bumped by every school write."""
+    return await _school_version.get()
+
+
+async def bump_school_version() -> int:
+    return await _school_version.bump()
+
+
+async def get_school_activity_version() -> int:
+    """Version of the qr_scans and access_logs collections."""
+    return await _activity_version.get()
+
+
+async def bump_school_activity_version() -> int:
+    return await _activity_version.bump()
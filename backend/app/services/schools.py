@@ -1,13 +1,36 @@
+import asyncio
 import re
-from typing import Dict, List
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from beanie import PydanticObjectId
+from bson import ObjectId
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.exceptions import InvalidCursor, LoomaIdExists, PreconditionFailed
+from app.db.mongodb import routed_reads
 from app.models.school import School
-from app.schemas.school import SchoolCreate, SchoolOut, SchoolStatus, SchoolUpdate
+from app.core.config import settings
+from app.schemas.school import SchoolCreate, SchoolSort, SchoolStatus, SchoolUpdate
+from app.services.activity_logs import activity_out, attach_activity_counts, school_activity_counts, school_activity_stages
+from app.services.school_changes import SchoolChange, apply_set, school_snapshot
+from app.services.school_events import publish_school_changes
+from app.services.school_serialization import SCHOOL_DETAIL_FIELDS, SCHOOL_FIELDS, SchoolFieldSet, SchoolOutDict, dump_schools, school_out_dict
+from app.services.school_rollups import apply_school_rollup_changes
+from app.services.school_uptime import record_status_transitions
+from app.services.school_version import bump_school_version
+from app.services.search_index import SEARCH_FIELDS, school_search_index
+from app.services.school_counters import (
+    aggregate_school_stats,
+    apply_school_counter_changes,
+    read_school_counters,
+    reconcile_school_counters,
+)
 from datetime import datetime, timezone
 
+from app.utils.cursor import decode_cursor, encode_cursor
 from app.utils.dates import now_utc
+from app.utils.geo import geo_point
 
 def flatten_dict(d: dict, prefix: str = "") -> dict:
     items = []
@@ -21,46 +44,178 @@ def flatten_dict(d: dict, prefix: str = "") -> dict:
 
     return dict(items)
 
-async def list_schools(search: str | None = None, province: str | None = None) -> List[SchoolOut]:
-    schools: List[School] = []
-    school_list: List[SchoolOut] = []
+# sort key -> direction; `_id` is always the tie-breaker in the same direction
+SCHOOL_SORT_DIRECTIONS = {SchoolSort.NAME: 1, SchoolSort.UPDATED_AT: -1}
+# sort key -> type a cursor's value must have; None when the last school lacked the field
+SCHOOL_SORT_TYPES = {SchoolSort.NAME: str, SchoolSort.UPDATED_AT: datetime}
 
+def _search_filter(search: str) -> dict:
+    if settings.SCHOOL_SEARCH_INDEX:
+        if school_search_index.ready:
+            return {"_id": {"$in": school_search_index.search(search)}}
+        # Index still loading: the text index can answer whole-word queries.
+        return {"$text": {"$search": search}}
+
+    safe_search = re.escape(search)
+    return {"$or": [{field: {"$regex": safe_search, "$options": "i"}} for field in SEARCH_FIELDS]}
+
+def search_index_generation(search: str | None) -> str | None:
+    """The search index state a `search` list is answered from, for its ETag.
+
+    Each worker only sees other workers' writes when its index refreshes, so
+    the school version alone doesn't pin the result.
+    """
+    if search is None or not settings.SCHOOL_SEARCH_INDEX:
+        return None
+    return school_search_index.generation
+
+def school_filter(search: str | None = None, province: str | None = None) -> dict:
     if search is not None:
-        safe_search = re.escape(search)
-        schools = await School.find(
-            {
-                "$or": [
-                    {"name": {"$regex": safe_search, "$options": "i"}},
-                    {"district": {"$regex": safe_search, "$options": "i"}},
-                    {"province": {"$regex": safe_search, "$options": "i"}},
-                    {"palika": {"$regex": safe_search, "$options": "i"}},
-                    {"contact.headmaster": {"$regex": safe_search, "$options": "i"}},
-                    {"loomaId": {"$regex": safe_search, "$options": "i"}},
-                ]
-            }
-        ).to_list()
-    elif province is not None:
-        schools = await School.find(School.province == province).to_list()
-    else:
-        schools = await School.find_all().to_list()
-
-    for school in schools:
-        s = SchoolOut(**school.model_dump(), qrScans=[], accessLogs=[])
-        school_list.append(s)
-
-    return school_list
+        return _search_filter(search)
+    if province is not None:
+        return {"province": province}
+    return {}
 
-async def get_school_stats() -> Dict[str, int]:
+async def iter_schools(
+    search: str | None = None, province: str | None = None, fields: SchoolFieldSet = SCHOOL_FIELDS
+) -> AsyncIterator[SchoolOutDict]:
+    # Raw driver cursor: documents are decoded one batch at a time and handed
+    # out as they arrive instead of being collected into a list first.
+    cursor = routed_reads(School.get_pymongo_collection()).find(
+        school_filter(search, province), fields.projection, batch_size=settings.SCHOOLS_STREAM_BATCH_SIZE
+    )
+    async with cursor:
+        async for doc in cursor:
+            yield school_out_dict(doc, fields)
+
+def _wants_counts(fields: SchoolFieldSet, activity: bool) -> bool:
+    return activity or fields.counts
+
+async def list_schools(
+    search: str | None = None,
+    province: str | None = None,
+    activity: bool = False,
+    fields: SchoolFieldSet = SCHOOL_FIELDS,
+) -> List[SchoolOutDict]:
+    query = school_filter(search, province)
+    docs = await routed_reads(School.get_pymongo_collection()).find(query, fields.projection).to_list()
+
+    ranked_ids = query.get("_id", {}).get("$in") if search is not None else None
+    if ranked_ids:
+        rank = {school_id: i for i, school_id in enumerate(ranked_ids)}
+        docs.sort(key=lambda doc: rank.get(doc["_id"], len(rank)))
+
+    schools = dump_schools(docs, fields)
+    if _wants_counts(fields, activity):
+        # Unfiltered lists count every school in one pass rather than sending all their ids.
+        school_ids = [doc["_id"] for doc in docs] if query else None
+        attach_activity_counts(schools, await school_activity_counts(school_ids))
+    return schools
+
+async def get_schools_by_ids(ids: List[PydanticObjectId], fields: SchoolFieldSet = SCHOOL_FIELDS) -> List[SchoolOutDict]:
+    """Schools with the given ids in one $in query, in request order; unknown ids are skipped."""
+    docs = await routed_reads(School.get_pymongo_collection()).find({"_id": {"$in": ids}}, fields.projection).to_list()
+    by_id = {doc["_id"]: doc for doc in docs}
+    return dump_schools((by_id[school_id] for school_id in dict.fromkeys(ids) if school_id in by_id), fields)
+
+def _keyset_filter(sort: SchoolSort, cursor: str) -> dict:
+    payload = decode_cursor(cursor)
+    if payload.get("s") != sort.value or "v" not in payload or not isinstance(payload.get("id"), ObjectId):
+        raise InvalidCursor
+    # The value lands in the query as-is, so anything else (e.g. an operator document) is rejected.
+    if payload["v"] is not None and not isinstance(payload["v"], SCHOOL_SORT_TYPES[sort]):
+        raise InvalidCursor
+
+    op = "$gt" if SCHOOL_SORT_DIRECTIONS[sort] == 1 else "$lt"
     return {
-        "total": await School.count(),
-        "online": await School.find(School.status == "online").count(),
-        "offline": await School.find(School.status == "offline").count(),
-        "maintenance": await School.find(School.status == "maintenance").count()
+        "$or": [
+            {sort.value: {op: payload["v"]}},
+            {sort.value: payload["v"], "_id": {op: payload["id"]}},
+        ]
     }
 
+async def list_schools_page(
+    search: str | None = None,
+    province: str | None = None,
+    limit: int = settings.SCHOOLS_PAGE_DEFAULT_LIMIT,
+    cursor: str | None = None,
+    sort: SchoolSort = SchoolSort.NAME,
+    include_total: bool = False,
+    activity: bool = False,
+    fields: SchoolFieldSet = SCHOOL_FIELDS,
+) -> Dict[str, Any]:
+    base_filter = school_filter(search, province)
+    page_filter = base_filter
+    if cursor is not None:
+        page_filter = {"$and": [base_filter, _keyset_filter(sort, cursor)]}
+
+    direction = SCHOOL_SORT_DIRECTIONS[sort]
+    collection = routed_reads(School.get_pymongo_collection())
+    docs = await (
+        collection
+        .find(page_filter, {**fields.projection, sort.value: 1})
+        .sort([(sort.value, direction), ("_id", direction)])
+        .limit(limit + 1)
+        .to_list()
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor({"s": sort.value, "v": last.get(sort.value), "id": last["_id"]})
+
+    total = await collection.count_documents(base_filter) if include_total else None
+
+    schools = dump_schools(docs, fields)
+    if _wants_counts(fields, activity):
+        attach_activity_counts(schools, await school_activity_counts([doc["_id"] for doc in docs]))
+    return {"schools": schools, "next_cursor": next_cursor, "total": total}
+
+def _apply_search_index_changes(changes: List[SchoolChange]):
+    if not settings.SCHOOL_SEARCH_INDEX:
+        return
+    for change in changes:
+        if change.after is not None:
+            school_search_index.upsert(change.after["_id"], change.after)
+        elif change.before is not None:
+            school_search_index.remove(change.before["_id"])
+
+async def _apply_versioned_changes(changes: List[SchoolChange]):
+    await asyncio.gather(apply_school_counter_changes(changes), apply_school_rollup_changes(changes))
+    # After the derived data, so a new ETag never pairs with old counters or rollups.
+    await bump_school_version()
+
+async def record_school_changes(changes: List[SchoolChange]):
+    if not changes:
+        return
+    _apply_search_index_changes(changes)
+    # Uptime isn't covered by the school version, so its writes don't have to
+    # land before the bump and run alongside the rest.
+    await asyncio.gather(_apply_versioned_changes(changes), record_status_transitions(changes))
+    publish_school_changes(changes)
+
+async def get_school_stats() -> Dict[str, int]:
+    if not settings.SCHOOL_STATS_COUNTERS:
+        return await aggregate_school_stats(routed=True)
+
+    stats = await read_school_counters()
+    if stats is None:
+        stats = await reconcile_school_counters()
+    return stats
+
 async def add_school(data: SchoolCreate) -> School:
-    school_to_create = School(**data.model_dump(), createdAt=datetime.now(timezone.utc), updatedAt=datetime.now(timezone.utc))
-    await School.create(school_to_create)
+    school_to_create = School(
+        **data.model_dump(),
+        location=geo_point(data.latitude, data.longitude),
+        createdAt=datetime.now(timezone.utc),
+        updatedAt=datetime.now(timezone.utc),
+    )
+    try:
+        await School.create(school_to_create)
+    except DuplicateKeyError:
+        raise LoomaIdExists()
+    await record_school_changes([SchoolChange(None, school_snapshot(school_to_create))])
     return school_to_create
 
 async def get_schoool_by_id(id: PydanticObjectId) -> School | None:
@@ -71,30 +226,125 @@ async def get_schoool_by_id(id: PydanticObjectId) -> School | None:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal server error occured when retrieving the school.")
     return school
 
-async def delete_school_by_id(id: PydanticObjectId):
-    school_to_delete = await School.find_one(School.id == id)
-    if not school_to_delete:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"School with id {id} not found")
-    await school_to_delete.delete()
+async def get_school_out(
+    id: PydanticObjectId, fields: SchoolFieldSet = SCHOOL_DETAIL_FIELDS
+) -> Tuple[SchoolOutDict, int] | None:
+    """The school with its latest QR scans and access logs and their counts, in
+    one round trip, and its revision (for the ETag, whatever `fields` selects)."""
+    projection = {**fields.projection, "revision": 1}
+    if not fields.activity:
+        doc = await School.get_pymongo_collection().find_one({"_id": id}, projection)
+        return (school_out_dict(doc, fields), doc.get("revision") or 0) if doc is not None else None
 
-async def update_school_status(id: PydanticObjectId, status_str: SchoolStatus):
-    school_to_update = await School.find_one(School.id == id)
-    if not school_to_update:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"School with id {id} not found")
+    cursor = await School.get_pymongo_collection().aggregate([
+        {"$match": {"_id": id}},
+        {"$project": projection},
+        *school_activity_stages(),
+    ])
+    docs = await cursor.to_list()
+    if not docs:
+        return None
 
-    await school_to_update.set({School.status: status_str})
-    await school_to_update.set({School.updatedAt: now_utc()})
-    return school_to_update
+    doc = docs[0]
+    school = school_out_dict(doc, fields)
+    for field in fields.activity:
+        if field in ("qrScans", "accessLogs"):
+            school[field] = [activity_out(entry) for entry in doc.get(field, [])]
+        else:
+            school[field] = doc[field]
+    return school, doc.get("revision") or 0
+
+async def get_school_looma_id(id: PydanticObjectId) -> str | None:
+    doc = await School.get_pymongo_collection().find_one({"_id": id}, {"loomaId": 1})
+    return doc["loomaId"] if doc is not None else None
+
+def _revision_filter(id: PydanticObjectId, revisions: List[int] | None) -> dict:
+    query: dict = {"_id": id}
+    if revisions is not None:
+        # Schools written before revisions existed have none; they read as 0.
+        query["revision"] = {"$in": revisions + [None] if 0 in revisions else revisions}
+    return query
 
-async def update_school(id: PydanticObjectId, data: SchoolUpdate) -> School:
-    school_to_update = await School.find_one(School.id == id)
-    if not school_to_update:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"School with id {id} not found")
+async def _write_failed(id: PydanticObjectId, revisions: List[int] | None):
+    """Raise the reason a filtered single-document write matched nothing."""
+    if revisions is not None and await School.get_pymongo_collection().count_documents({"_id": id}, limit=1):
+        raise PreconditionFailed
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"School with id {id} not found")
 
-    update_dict = data.model_dump(exclude_unset=True)
-    flat_dict = flatten_dict(update_dict)
+def _next_revision(before: dict) -> int:
+    return (before.get("revision") or 0) + 1
 
-    await school_to_update.set(flat_dict)
-    await school_to_update.set({School.updatedAt: now_utc()})
+async def delete_school_by_id(id: PydanticObjectId, revisions: List[int] | None = None):
+    before = await School.get_pymongo_collection().find_one_and_delete(_revision_filter(id, revisions))
+    if before is None:
+        await _write_failed(id, revisions)
+    await record_school_changes([SchoolChange(before, None)])
+
+async def _set_school_fields(id: PydanticObjectId, fields: dict, revisions: List[int] | None) -> School:
+    # One round trip: the pre-image comes back with the write, and the
+    # post-image is derived from it, so change tracking gets both.
+    try:
+        before = await School.get_pymongo_collection().find_one_and_update(
+            _revision_filter(id, revisions),
+            {"$set": fields, "$inc": {"revision": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise LoomaIdExists()
+    if before is None:
+        await _write_failed(id, revisions)
+
+    after = apply_set(before, {**fields, "revision": _next_revision(before)})
+    await record_school_changes([SchoolChange(before, after)])
+    return School.model_validate(after)
+
+async def update_school_status(id: PydanticObjectId, status_str: SchoolStatus, revisions: List[int] | None = None) -> School:
+    return await _set_school_fields(id, {"status": status_str.value, "updatedAt": now_utc()}, revisions)
+
+def _literal(value: Any) -> Any:
+    # Pipeline updates read "$..." strings and operator dicts as expressions.
+    return {"$literal": value}
+
+def _location_expression() -> dict:
+    """geo_point() as an aggregation expression over the stored coordinates."""
+    in_range = {"$and": [
+        {"$gte": ["$latitude", -90]}, {"$lte": ["$latitude", 90]},
+        {"$gte": ["$longitude", -180]}, {"$lte": ["$longitude", 180]},
+    ]}
+    return {"$cond": [in_range, {"type": "Point", "coordinates": ["$longitude", "$latitude"]}, None]}
+
+async def update_school(id: PydanticObjectId, data: SchoolUpdate, revisions: List[int] | None = None) -> School:
+    flat_dict = flatten_dict(data.model_dump(exclude_unset=True))
+    if "status" in flat_dict and flat_dict["status"] is not None:
+        flat_dict["status"] = flat_dict["status"].value
+    flat_dict["updatedAt"] = now_utc()
+
+    latitude, longitude = flat_dict.get("latitude"), flat_dict.get("longitude")
+    if latitude is None and longitude is None:
+        return await _set_school_fields(id, flat_dict, revisions)
+
+    if latitude is not None and longitude is not None:
+        flat_dict["location"] = geo_point(latitude, longitude)
+        return await _set_school_fields(id, flat_dict, revisions)
+
+    # Only one coordinate changes: the location is rebuilt server-side from
+    # the stored other one, still in the same round trip.
+    try:
+        before = await School.get_pymongo_collection().find_one_and_update(
+            _revision_filter(id, revisions),
+            [
+                {"$set": {**{path: _literal(value) for path, value in flat_dict.items()},
+                          "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}}},
+                {"$set": {"location": _location_expression()}},
+            ],
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise LoomaIdExists()
+    if before is None:
+        await _write_failed(id, revisions)
 
-    return school_to_update
+    after = apply_set(before, {**flat_dict, "revision": _next_revision(before)})
+    after["location"] = geo_point(after["latitude"], after["longitude"])
+    await record_school_changes([SchoolChange(before, after)])
+    return School.model_validate(after)
@@ -0,0 +1,225 @@
+import asyncio
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.school import School
+
+logger = get_logger(__name__)
+
+SEARCH_FIELDS = ["name", "district", "province", "palika", "contact.headmaster", "loomaId"]
+
+# Spelling variants that are common when Nepali place names are romanised
+# ("Chhetri"/"Chetri", "Shankhuwasabha"/"Sankhuwasabha", "Viratnagar"/"Biratnagar").
+# Applied to both the indexed text and the query, so they only ever widen matches.
+_ROMANISATION_FOLDS = [
+    ("chh", "ch"),
+    ("sh", "s"),
+    ("ph", "f"),
+    ("aa", "a"),
+    ("ee", "i"),
+    ("oo", "u"),
+    ("v", "b"),
+    ("w", "b"),
+]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _NON_ALNUM.sub(" ", text)
+    for variant, folded in _ROMANISATION_FOLDS:
+        text = text.replace(variant, folded)
+    return " ".join(text.split())
+
+
+def _grams(token: str, pad_end: bool) -> Set[str]:
+    # A leading pad makes word prefixes first-class grams; the query side leaves
+    # the end open so that "kath" still matches "kathmandu".
+    padded = f" {token} " if pad_end else f" {token}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def document_grams(text: str) -> Set[str]:
+    grams: Set[str] = set()
+    for token in text.split():
+        grams |= _grams(token, pad_end=True)
+    return grams
+
+
+def query_grams(text: str) -> Set[str]:
+    grams: Set[str] = set()
+    for token in text.split():
+        grams |= _grams(token, pad_end=False)
+    return grams
+
+
+def _field_value(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def searchable_text(doc: Dict[str, Any]) -> str:
+    values = (_field_value(doc, field) for field in SEARCH_FIELDS)
+    return normalize(" ".join(str(value) for value in values if value))
+
+
+class SchoolSearchIndex:
+    """In-memory trigram index over the school search fields.
+
+    Candidates are scored by the share of query trigrams they contain, so a
+    dropped or swapped letter still leaves most trigrams intact; an exact
+    substring or word-prefix hit ranks above a fuzzy one.
+    """
+
+    def __init__(self, min_similarity: float):
+        self.min_similarity = min_similarity
+        self.ready = False
+        self._texts: Dict[ObjectId, str] = {}
+        self._postings: Dict[str, Set[ObjectId]] = {}
+        self._loading = False
+        self._replay: List[tuple[ObjectId, Dict[str, Any] | None]] = []
+        self._load_id: ObjectId | None = None
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @property
+    def generation(self) -> str | None:
+        """Names the exact state the index answers from: its load plus the writes applied since.
+
+        Unique per load, so two workers never share a generation even when
+        they have seen different writes at the same school version.
+        """
+        return f"{self._load_id}.{self._writes}" if self.ready else None
+
+    def _add(self, texts, postings, school_id: ObjectId, text: str):
+        texts[school_id] = text
+        for gram in document_grams(text):
+            postings.setdefault(gram, set()).add(school_id)
+
+    def _remove(self, school_id: ObjectId):
+        text = self._texts.pop(school_id, None)
+        if text is None:
+            return
+        for gram in document_grams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(school_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def upsert(self, school_id: ObjectId, doc: Dict[str, Any]):
+        if self._loading:
+            self._replay.append((school_id, doc))
+        self._writes += 1
+        self._remove(school_id)
+        self._add(self._texts, self._postings, school_id, searchable_text(doc))
+
+    def remove(self, school_id: ObjectId):
+        if self._loading:
+            self._replay.append((school_id, None))
+        self._writes += 1
+        self._remove(school_id)
+
+    def begin_load(self):
+        self._loading = True
+        self._replay = []
+
+    def build(self, docs: Iterable[Dict[str, Any]]) -> Tuple[Dict[ObjectId, str], Dict[str, Set[ObjectId]]]:
+        """A fresh index over `docs`; touches no shared state, so it can run off the event loop."""
+        texts: Dict[ObjectId, str] = {}
+        postings: Dict[str, Set[ObjectId]] = {}
+        for doc in docs:
+            self._add(texts, postings, doc["_id"], searchable_text(doc))
+        return texts, postings
+
+    def finish_load(self, texts: Dict[ObjectId, str], postings: Dict[str, Set[ObjectId]]):
+        replay, self._replay, self._loading = self._replay, [], False
+        self._texts, self._postings = texts, postings
+        self._load_id, self._writes = ObjectId(), 0
+        # Writes that landed while the snapshot was being read win over it.
+        for school_id, doc in replay:
+            if doc is None:
+                self._remove(school_id)
+            else:
+                self.upsert(school_id, doc)
+        self.ready = True
+
+    def search(self, query: str) -> List[ObjectId]:
+        normalized = normalize(query)
+        if not normalized:
+            return []
+
+        grams = query_grams(normalized)
+        if not grams:
+            # Single-character queries have no trigram; a linear scan of the
+            # in-memory texts is still far cheaper than a collection scan.
+            hits = [school_id for school_id, text in self._texts.items() if normalized in text]
+            return sorted(hits, key=lambda school_id: self._texts[school_id])
+
+        counts: Counter = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+
+        scored = []
+        for school_id, count in counts.items():
+            score = count / len(grams)
+            if score < self.min_similarity:
+                continue
+            text = self._texts[school_id]
+            if normalized in text:
+                score += 1.0
+            if any(word.startswith(token) for token in normalized.split() for word in text.split()):
+                score += 0.5
+            scored.append((-score, text, school_id))
+
+        scored.sort()
+        return [school_id for _, _, school_id in scored]
+
+
+school_search_index = SchoolSearchIndex(min_similarity=settings.SCHOOL_SEARCH_MIN_SIMILARITY)
+
+
+async def load_school_search_index():
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    school_search_index.begin_load()
+    try:
+        cursor = School.get_pymongo_collection().find({}, projection, batch_size=settings.SCHOOLS_STREAM_BATCH_SIZE)
+        docs = await cursor.to_list()
+        # Building is the expensive part; in a thread the loop keeps serving
+        # requests (the GIL is handed back every few ms) while the old index
+        # answers searches and takes writes, which are replayed onto the new one.
+        texts, postings = await asyncio.to_thread(school_search_index.build, docs)
+    except BaseException:
+        school_search_index._loading = False
+        raise
+    school_search_index.finish_load(texts, postings)
+    logger.info(f"School search index loaded with {len(school_search_index)} schools")
+
+
+async def run_school_search_index():
+    """Load the index, then periodically rebuild it to pick up other workers' writes."""
+    while True:
+        try:
+            await load_school_search_index()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"School search index load failed: {e}")
+
+        if settings.SCHOOL_SEARCH_INDEX_REFRESH_SECONDS <= 0 and school_search_index.ready:
+            return
+        await asyncio.sleep(max(settings.SCHOOL_SEARCH_INDEX_REFRESH_SECONDS, 5))
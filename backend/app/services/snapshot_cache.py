@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.services.school_serialization import dump_json
+from app.utils.etag import encoding_etag
+
+try:
+    import brotli
+except ImportError: # optional; bodies are then only precompressed with gzip
+    brotli = None
+
+
+class Snapshot(NamedTuple):
+    body: bytes
+    gzip: bytes
+    brotli: bytes | None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip) + len(self.brotli or b"")
+
+
+def _encode(value: Any) -> Snapshot:
+    body = dump_json(value)
+    compressed = gzip.compress(body, settings.SCHOOL_SNAPSHOT_GZIP_LEVEL, mtime=0)
+    br = brotli.compress(body, quality=settings.SCHOOL_SNAPSHOT_BROTLI_QUALITY) if brotli is not None else None
+    return Snapshot(body, compressed, br)
+
+
+class SnapshotCache:
+    """Encoded and precompressed response bodies, keyed by ETag.
+
+    The ETag already covers the school version and the query parameters, so
+    a write makes every older entry unreachable; those age out through LRU
+    eviction under `max_bytes`. Concurrent misses for the same key share
+    one build (single-flight).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Snapshot] = OrderedDict()
+        self._building: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    async def get(self, key: str, build: Callable[[], Awaitable[Any]]) -> Snapshot:
+        snapshot = self._entries.get(key)
+        if snapshot is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+        task = self._building.get(key)
+        if task is not None:
+            self.hits += 1 # joins a build already in flight
+        else:
+            self.misses += 1
+            # A task of its own, so a client that disconnects doesn't cancel
+            # the build for everyone else waiting on it.
+            task = self._building[key] = asyncio.create_task(self._build(key, build))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._building.pop(key, None)
+        if not task.cancelled():
+            # Mark a failure as seen even if every waiter went away.
+            task.exception()
+
+    async def _build(self, key: str, build: Callable[[], Awaitable[Any]]) -> Snapshot:
+        value = await build()
+        # zlib and brotli release the GIL, so compressing big lists doesn't stall the loop.
+        snapshot = await asyncio.to_thread(_encode, value)
+        self._store(key, snapshot)
+        return snapshot
+
+    def _store(self, key: str, snapshot: Snapshot):
+        if snapshot.size > self.max_bytes:
+            return
+        self._entries[key] = snapshot
+        self.bytes += snapshot.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def snapshot_response(request: Request, snapshot: Snapshot, headers: Dict[str, str]) -> Response:
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if snapshot.brotli is not None and _accepts(request, "br"):
+        content, headers["Content-Encoding"] = snapshot.brotli, "br"
+    elif _accepts(request, "gzip"):
+        content, headers["Content-Encoding"] = snapshot.gzip, "gzip"
+    else:
+        content = snapshot.body
+    if "Content-Encoding" in headers and "ETag" in headers:
+        headers["ETag"] = encoding_etag(headers["ETag"], headers["Content-Encoding"])
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+school_snapshots = SnapshotCache(settings.SCHOOL_SNAPSHOT_CACHE_MAX_BYTES)
@@ -1,9 +1,12 @@
 from datetime import datetime, timezone
 from beanie import PydanticObjectId
 from pydantic import EmailStr
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.core.exceptions import EmailExists, UserExists, UserNotFound
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.core.session_cache import principal_cache
 from app.models.user import UserDoc
 from app.schemas.user import UserAdd, UserEdit, UserEditMe, UserOut
 
@@ -26,14 +29,34 @@ async def get_user_by_id(user_id: PydanticObjectId) -> UserDoc | None:
         return None
     return user
 
-async def add_user(user_data: UserAdd) -> UserDoc:
-    hashed_password = get_password_hash(user_data.password)
-
-    if await get_user_by_username(user_data.username) is not None:
-        raise UserExists()
-
-    if await get_user_by_email(user_data.email) is not None:
+def _raise_duplicate(e: DuplicateKeyError):
+    key_pattern = (e.details or {}).get("keyPattern", {})
+    if "email" in key_pattern:
         raise EmailExists()
+    raise UserExists()
+
+async def _set_user_fields(user_id: PydanticObjectId, update_dict: dict) -> dict:
+    """Apply `update_dict` in one round trip and return the pre-update document.
+
+    Uniqueness of username/email is enforced by the unique indexes.
+    """
+    collection = UserDoc.get_pymongo_collection()
+    try:
+        if update_dict:
+            before = await collection.find_one_and_update(
+                {"_id": user_id}, {"$set": update_dict}, return_document=ReturnDocument.BEFORE
+            )
+        else:
+            before = await collection.find_one({"_id": user_id})
+    except DuplicateKeyError as e:
+        _raise_duplicate(e)
+
+    if before is None:
+        raise UserNotFound
+    return before
+
+async def add_user(user_data: UserAdd) -> UserDoc:
+    hashed_password = await get_password_hash_async(user_data.password)
 
     new_user = UserDoc(
         username=user_data.username,
@@ -42,48 +65,37 @@ async def add_user(user_data: UserAdd) -> UserDoc:
         role=user_data.role,
         createdAt=datetime.now(timezone.utc),
     )
-    await UserDoc.create(new_user)
+    try:
+        await UserDoc.create(new_user)
+    except DuplicateKeyError as e:
+        _raise_duplicate(e)
     return new_user
 
 async def delete_user_by_id(user_id: PydanticObjectId):
-    user_to_delete = await UserDoc.find_one(UserDoc.id == user_id)
-    if not user_to_delete:
+    result = await UserDoc.find_one(UserDoc.id == user_id).delete()
+    if not result or result.deleted_count == 0:
         raise UserNotFound
-    await user_to_delete.delete()
-
+    principal_cache.evict_user(user_id)
 
-async def edit_user(user_id: PydanticObjectId, user_data: UserEdit) -> UserOut:
-    user_to_update = await UserDoc.find_one(UserDoc.id == user_id)
 
-    if not user_to_update:
-        raise UserNotFound
-
-    if user_data.username and await get_user_by_username(user_data.username) and user_to_update.username != user_data.username:
-        raise UserExists
-
-    if user_data.email and await get_user_by_email(user_data.email) and user_to_update.email != user_data.email:
-        raise EmailExists
+def _principal_changed(before: dict, update_dict: dict) -> bool:
+    # Cached principals carry the role and the username written to access logs.
+    return any(field in update_dict and update_dict[field] != before[field] for field in ("role", "username"))
 
+async def edit_user(user_id: PydanticObjectId, user_data: UserEdit) -> UserOut:
     update_dict = user_data.model_dump(exclude_unset=True, exclude_none=True)
+    before = await _set_user_fields(user_id, update_dict)
 
-    await user_to_update.set(update_dict)
+    if _principal_changed(before, update_dict):
+        principal_cache.evict_user(user_id)
 
-    return UserOut(**user_to_update.model_dump())
+    return UserOut(id=before["_id"], **{**before, **update_dict})
 
 async def edit_user_me(user_id: PydanticObjectId, user_data: UserEditMe) -> UserOut:
-    user_to_update = await UserDoc.find_one(UserDoc.id == user_id)
-
-    if not user_to_update:
-        raise UserNotFound
-
-    if user_data.username and await get_user_by_username(user_data.username) and user_to_update.username != user_data.username:
-        raise UserExists
-
-    if user_data.email and await get_user_by_email(user_data.email) and user_to_update.email != user_data.email:
-        raise EmailExists
-
     update_dict = user_data.model_dump(exclude_unset=True, exclude_none=True)
+    before = await _set_user_fields(user_id, update_dict)
 
-    await user_to_update.set(update_dict)
+    if _principal_changed(before, update_dict):
+        principal_cache.evict_user(user_id)
 
-    return UserOut(**user_to_update.model_dump())
+    return UserOut(id=before["_id"], **{**before, **update_dict})
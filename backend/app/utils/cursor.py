@@ -0,0 +1,24 @@
+import base64
+import binascii
+from typing import Any, Dict
+
+from bson import json_util
+from bson.errors import InvalidBSON
+
+from app.core.exceptions import InvalidCursor
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json_util.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, InvalidBSON, UnicodeDecodeError):
+        raise InvalidCursor
+    if not isinstance(payload, dict):
+        raise InvalidCursor
+    return payload
@@ -0,0 +1,80 @@
+import hashlib
+from typing import Any, List
+
+from fastapi import Request
+
+
+def make_etag(version: int, *parts: Any) -> str:
+    digest = hashlib.sha1(repr((version, parts)).encode()).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def revision_etag(revision: int, etag: str) -> str:
+    """`etag` prefixed with the document's revision: `"r<revision>.<digest>"`.
+
+    Clients can send it back as If-Match as is to pin a write to that revision.
+    """
+    digest = etag.strip('"')
+    return f'"r{revision}.{digest}"'
+
+
+def encoding_etag(etag: str, encoding: str) -> str:
+    """`etag` for the body compressed with `encoding`: `"<digest>-<encoding>"`.
+
+    Each encoding is a different byte sequence, so it gets its own strong tag.
+    """
+    digest = etag.strip('"')
+    return f'"{digest}-{encoding}"'
+
+
+def _candidates(header: str, strong_only: bool = False) -> List[str]:
+    candidates = [candidate.strip() for candidate in header.split(",") if candidate.strip()]
+    if strong_only:
+        candidates = [candidate for candidate in candidates if not candidate.startswith("W/")]
+    return [candidate.removeprefix("W/").strip('"') for candidate in candidates]
+
+
+def matching_etag(request: Request, etag: str, exists: bool = True) -> str | None:
+    """The If-None-Match entry naming `etag`, also as the digest of a revision
+    ETag or with an encoding suffix.
+
+    A revision ETag carries the school version in its digest, and every
+    revision bump moves that version, so the digest alone decides. The
+    entry is returned so a 304 can repeat the tag the client holds. `*`
+    only matches once the resource is known to `exist`.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    digest = etag.strip('"')
+    for candidate in _candidates(header):
+        if (candidate == "*" and exists) or candidate == digest:
+            return etag
+        if candidate.partition(".")[2] == digest or candidate.partition("-")[0] == digest:
+            return f'"{candidate}"'
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    return matching_etag(request, etag) is not None
+
+
+def if_match_revisions(request: Request) -> List[int] | None:
+    """The document revisions an If-Match header pins a write to, if any.
+
+    Accepts the ETag from GET /schools/{id} (`"r3.<digest>"`), a bare
+    revision (`"3"` or `3`) and comma-separated lists; `*` (or no header)
+    pins nothing. If-Match compares strongly, so weak tags and tags naming no
+    revision match nothing, and the write fails with 412.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return None
+    revisions = []
+    for candidate in _candidates(header, strong_only=True):
+        if candidate == "*":
+            return None
+        value = candidate.partition(".")[0].removeprefix("r") if candidate.startswith("r") else candidate
+        if value.isdigit():
+            revisions.append(int(value))
+    return revisions
@@ -0,0 +1,12 @@
+from typing import Any, Dict
+
+
+def geo_point(latitude: float, longitude: float) -> Dict[str, Any] | None:
+    """GeoJSON point for the 2dsphere index, or None if the coordinates are out of range.
+
+    An out-of-range point would make Mongo reject the whole write.
+    """
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
@@ -0,0 +1,137 @@
+"""Synthetic Looma fleet: schools spread over real provinces, districts and palikas,
+plus the users and sessions that browse it."""
+import random
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bson import ObjectId
+
+from app.utils.dates import now_utc
+from app.utils.geo import geo_point
+
+# (province, centre lat, centre lng) -> district -> palikas
+GEOGRAPHY: Dict[Tuple[str, float, float], Dict[str, List[str]]] = {
+    ("Koshi", 26.9, 87.3): {
+        "Morang": ["Biratnagar", "Sundarharaicha", "Belbari", "Urlabari"],
+        "Sunsari": ["Itahari", "Dharan", "Inaruwa", "Duhabi"],
+        "Jhapa": ["Mechinagar", "Damak", "Birtamod", "Bhadrapur"],
+        "Sankhuwasabha": ["Khandbari", "Chainpur", "Madi"],
+    },
+    ("Madhesh", 26.8, 85.9): {
+        "Dhanusha": ["Janakpurdham", "Mithila", "Sabaila"],
+        "Parsa": ["Birgunj", "Pokhariya", "Bahudarmai"],
+        "Saptari": ["Rajbiraj", "Kanchanrup", "Hanumannagar Kankalini"],
+    },
+    ("Bagmati", 27.7, 85.3): {
+        "Kathmandu": ["Kathmandu", "Kageshwari Manohara", "Tokha", "Budhanilkantha"],
+        "Lalitpur": ["Lalitpur", "Godawari", "Mahalaxmi"],
+        "Bhaktapur": ["Bhaktapur", "Madhyapur Thimi", "Suryabinayak"],
+        "Chitwan": ["Bharatpur", "Ratnanagar", "Khairahani"],
+    },
+    ("Gandaki", 28.2, 84.0): {
+        "Kaski": ["Pokhara", "Annapurna", "Machhapuchchhre"],
+        "Gorkha": ["Gorkha", "Palungtar", "Siranchok"],
+        "Tanahun": ["Byas", "Shuklagandaki", "Bhanu"],
+    },
+    ("Lumbini", 27.7, 83.4): {
+        "Rupandehi": ["Butwal", "Siddharthanagar", "Tilottama", "Devdaha"],
+        "Dang": ["Ghorahi", "Tulsipur", "Lamahi"],
+        "Banke": ["Nepalgunj", "Kohalpur", "Khajura"],
+    },
+    ("Karnali", 29.0, 82.0): {
+        "Surkhet": ["Birendranagar", "Gurbhakot", "Lekbeshi"],
+        "Jumla": ["Chandannath", "Tatopani", "Patarasi"],
+    },
+    ("Sudurpashchim", 29.0, 80.6): {
+        "Kailali": ["Dhangadhi", "Tikapur", "Ghodaghodi", "Lamki Chuha"],
+        "Kanchanpur": ["Bhimdatta", "Punarbas", "Belauri"],
+        "Doti": ["Dipayal Silgadhi", "Shikhar"],
+    },
+}
+
+LOOMA_VERSIONS = ["2.4.1", "2.5.0", "2.5.3", "3.0.0", "3.1.2"]
+STATUS_WEIGHTS = {"online": 70, "offline": 25, "maintenance": 5}
+SCHOOL_KINDS = ["Secondary School", "Basic School", "Higher Secondary School", "Community School"]
+HEADMASTERS = ["Ram Sharma", "Sita Karki", "Hari Thapa", "Gita Rai", "Bikash Gurung", "Sunita Magar", "Prakash Yadav"]
+
+
+def _places(rng: random.Random) -> List[Tuple[str, str, str, float, float]]:
+    places = []
+    for (province, lat, lng), districts in GEOGRAPHY.items():
+        for district, palikas in districts.items():
+            for palika in palikas:
+                places.append((province, district, palika, lat + rng.uniform(-0.5, 0.5), lng + rng.uniform(-0.8, 0.8)))
+    return places
+
+
+def looma_id(i: int) -> str:
+    return f"LM-{i:06d}"
+
+
+def school_docs(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield `n` raw school documents (with `_id`), deterministic for a given seed."""
+    rng = random.Random(seed)
+    places = _places(rng)
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    now = now_utc()
+    for i in range(n):
+        province, district, palika, lat, lng = rng.choice(places)
+        latitude = round(lat + rng.gauss(0, 0.05), 6)
+        longitude = round(lng + rng.gauss(0, 0.05), 6)
+        loomaId = looma_id(i)
+        created = now - timedelta(days=rng.randint(30, 900))
+        yield {
+            "_id": ObjectId(),
+            "name": f"{palika} {rng.choice(SCHOOL_KINDS)} {i}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "location": geo_point(latitude, longitude),
+            "contact": {
+                "email": f"school{i}@example.edu.np",
+                "phone": f"+977-98{rng.randint(10000000, 99999999)}",
+                "headmaster": rng.choice(HEADMASTERS),
+            },
+            "province": province,
+            "district": district,
+            "palika": palika,
+            "status": rng.choices(statuses, weights)[0],
+            "lastSeen": now - timedelta(minutes=rng.randint(0, 60 * 24 * 7)),
+            "loomaId": loomaId,
+            "loomaCount": rng.randint(1, 4),
+            "looma": {
+                "id": loomaId,
+                "serialNumber": f"SN{rng.randint(100000, 999999)}",
+                "version": rng.choice(LOOMA_VERSIONS),
+                "lastUpdate": created + timedelta(days=rng.randint(0, 29)),
+            },
+            "createdAt": created,
+            "updatedAt": now - timedelta(days=rng.randint(0, 29)),
+        }
+
+
+def user_docs(n: int, password_hash: str, prefix: str = "bench") -> Iterator[Dict[str, Any]]:
+    """Staff and viewer accounts sharing one password hash (bcrypt is too slow to run per user)."""
+    now = now_utc()
+    for i in range(n):
+        yield {
+            "_id": ObjectId(),
+            "username": f"{prefix}-user-{i}",
+            "email": f"{prefix}-user-{i}@example.org",
+            "passwordHash": password_hash,
+            "role": "staff" if i % 4 == 0 else "viewer",
+            "createdAt": now,
+            "lastLogin": None,
+        }
+
+
+def session_docs(users: List[Dict[str, Any]], per_user: int, ttl: timedelta = timedelta(days=7)) -> Iterator[Dict[str, Any]]:
+    now = now_utc()
+    for user in users:
+        for i in range(per_user):
+            yield {
+                "_id": ObjectId(),
+                "userId": user["_id"],
+                "token": f"bench-{user['_id']}-{i}",
+                "expiresAt": now + ttl,
+                "createdAt": now,
+            }
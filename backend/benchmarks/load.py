@@ -0,0 +1,327 @@
+"""Throughput, latency and Mongo round trips per request for the main API scenarios.
+
+Seeds a dedicated database (default: <MONGODB_DB_NAME>_bench, dropped before
+and after the run) with benchmarks.datagen, then drives app.main:app
+in-process, lifespan included, over an httpx ASGI transport. Results are
+written as JSON so runs can be compared over time. Run from backend/:
+
+    python -m benchmarks.load --schools 10000 --duration 10 --concurrency 8
+    python -m benchmarks.load --scenarios list_page,detail --compare benchmarks/results/load-<earlier>.json
+
+With --base-url the scenarios go over real HTTP to a server started
+separately (e.g. `python -m app.serve`) on a database seeded and kept by an
+earlier run; Mongo round trips can't be counted from outside that server:
+
+    python -m benchmarks.load --keep --scenarios stats --duration 1
+    MONGODB_DB_NAME=<db>_bench python -m app.serve --workers 4 &
+    python -m benchmarks.load --no-seed --keep --base-url http://127.0.0.1:8000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+from pymongo import AsyncMongoClient, monitoring
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.main import app
+from app.services.search_index import school_search_index
+from benchmarks.datagen import GEOGRAPHY, looma_id, school_docs, session_docs, user_docs
+from benchmarks.login_contention import percentile
+
+BENCH_PASSWORD = "bench-load-password"
+RESULTS_DIR = Path(__file__).parent / "results"
+SEED_BATCH_SIZE = 1000
+
+# Settings that change what a scenario measures; recorded with every run.
+SETTINGS_PREFIXES = ("SCHOOL_", "SCHOOLS_", "PASSWORD_HASH_", "SESSION_CACHE_", "HEARTBEAT_FLUSH_")
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts every command the driver sends, i.e. Mongo round trips."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@dataclass
+class Fixture:
+    school_ids: List[str]
+    usernames: List[str]
+    viewer_tokens: List[str]
+    staff_tokens: List[str]
+    search_terms: List[str]
+    provinces: List[str]
+
+
+@dataclass
+class Scenario:
+    name: str
+    role: str  # whose session cookie the scenario's client carries: "viewer", "staff" or "anonymous"
+    request: Callable[[httpx.AsyncClient, random.Random, Fixture], Awaitable[httpx.Response]]
+
+
+def _misspell(rng: random.Random, word: str) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+SCENARIOS = [
+    Scenario("list_all", "viewer", lambda c, rng, f: c.get("/schools")),
+    Scenario("list_page", "viewer", lambda c, rng, f: c.get("/schools", params={"limit": 50, "province": rng.choice(f.provinces)})),
+    Scenario("search", "viewer", lambda c, rng, f: c.get("/schools", params={"search": rng.choice(f.search_terms)})),
+    Scenario("stats", "viewer", lambda c, rng, f: c.get("/schools", params={"stats": "true"})),
+    Scenario("detail", "viewer", lambda c, rng, f: c.get(f"/schools/{rng.choice(f.school_ids)}")),
+    Scenario(
+        "login",
+        "anonymous",
+        lambda c, rng, f: c.post("/auth/login", json={"username": rng.choice(f.usernames), "password": BENCH_PASSWORD}),
+    ),
+    Scenario(
+        "status_update",
+        "staff",
+        lambda c, rng, f: c.patch(
+            f"/schools/{rng.choice(f.school_ids)}/status",
+            json={"status": rng.choice(["online", "offline", "maintenance"])},
+        ),
+    ),
+]
+
+
+async def seed(database: str, schools: int, users: int, sessions_per_user: int):
+    client = AsyncMongoClient(settings.MONGODB_URI)
+    try:
+        await client.drop_database(database)
+        db = client[database]
+
+        batch: List[Dict[str, Any]] = []
+        for doc in school_docs(schools):
+            batch.append(doc)
+            if len(batch) >= SEED_BATCH_SIZE:
+                await db["schools"].insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            await db["schools"].insert_many(batch, ordered=False)
+
+        user_list = list(user_docs(users, get_password_hash(BENCH_PASSWORD)))
+        if user_list:
+            await db["users"].insert_many(user_list, ordered=False)
+        session_list = list(session_docs(user_list, sessions_per_user))
+        if session_list:
+            await db["sessions"].insert_many(session_list, ordered=False)
+    finally:
+        await client.close()
+
+
+async def load_fixture(database: str) -> Fixture:
+    """Ids, usernames and session tokens of a seeded database, for the scenarios to pick from."""
+    client = AsyncMongoClient(settings.MONGODB_URI)
+    try:
+        db = client[database]
+        school_ids = [str(doc["_id"]) async for doc in db["schools"].find({}, {"_id": 1})]
+        roles = {doc["_id"]: doc["role"] async for doc in db["users"].find({"username": {"$regex": "^bench-"}}, {"role": 1})}
+        usernames = [doc["username"] async for doc in db["users"].find({"_id": {"$in": list(roles)}}, {"username": 1})]
+        sessions = await db["sessions"].find({"userId": {"$in": list(roles)}}, {"userId": 1, "token": 1}).to_list()
+    finally:
+        await client.close()
+
+    palikas = [palika for districts in GEOGRAPHY.values() for palikas in districts.values() for palika in palikas]
+    search_rng = random.Random(1)
+    return Fixture(
+        school_ids=school_ids,
+        usernames=usernames,
+        viewer_tokens=[s["token"] for s in sessions if roles[s["userId"]] == "viewer"],
+        staff_tokens=[s["token"] for s in sessions if roles[s["userId"]] == "staff"],
+        search_terms=palikas + [_misspell(search_rng, palika) for palika in palikas] + [looma_id(i) for i in range(50)],
+        provinces=[province for province, _, _ in GEOGRAPHY],
+    )
+
+
+def _client(fixture: Fixture, role: str, base_url: str | None) -> httpx.AsyncClient:
+    cookies = {}
+    if role != "anonymous":
+        tokens = fixture.staff_tokens if role == "staff" else fixture.viewer_tokens
+        cookies[settings.SESSION_COOKIE_NAME] = tokens[0]
+    if base_url is not None:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        return httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=None, limits=limits)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", cookies=cookies, timeout=None)
+
+
+async def _worker(scenario: Scenario, client, fixture: Fixture, worker_seed: int, deadline: float, latencies: List[float], statuses: Dict[int, int]):
+    rng = random.Random(worker_seed)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await scenario.request(client, rng, fixture)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run_scenario(
+    scenario: Scenario,
+    fixture: Fixture,
+    counter: CommandCounter | None,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    base_url: str | None = None,
+) -> Dict[str, Any]:
+    async with _client(fixture, scenario.role, base_url) as client:
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(_worker(scenario, client, fixture, -i - 1, deadline, [], {}) for i in range(concurrency)))
+
+        latencies: List[float] = []
+        statuses: Dict[int, int] = {}
+        commands_before = counter.count if counter is not None else 0
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(_worker(scenario, client, fixture, i, deadline, latencies, statuses) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        commands = counter.count - commands_before if counter is not None else None
+
+    requests = len(latencies)
+    return {
+        "requests": requests,
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / requests if requests else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies, default=0.0),
+        "mongo_round_trips_per_request": commands / requests if requests and commands is not None else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _wait_for_search_index(timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while settings.SCHOOL_SEARCH_INDEX and not school_search_index.ready and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+
+
+def _round_trips(value: float | None) -> str:
+    return "n/a" if value is None else f"{value:.2f}"
+
+
+def _print_comparison(results: Dict[str, Any], baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text())["scenarios"]
+    print(f"\ncompared with {baseline_path}:")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        print(
+            f"{name:>14}: throughput {result['throughput_rps'] / before['throughput_rps'] - 1:+.0%} "
+            f"p95 {result['p95_ms'] / before['p95_ms'] - 1:+.0%} "
+            f"round trips {_round_trips(before['mongo_round_trips_per_request'])} -> {_round_trips(result['mongo_round_trips_per_request'])}"
+        )
+
+
+async def main(args: argparse.Namespace):
+    selected = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios.split(",")]
+    database = args.database or f"{settings.MONGODB_DB_NAME}_bench"
+    if not args.no_seed:
+        await seed(database, args.schools, args.users, args.sessions_per_user)
+    fixture = await load_fixture(database)
+    settings.MONGODB_DB_NAME = database
+
+    counter = None
+    if args.base_url is None:
+        # Registered before the app's client exists so that client picks it up.
+        counter = CommandCounter()
+        monitoring.register(counter)
+    else:
+        print(f"using {database}; the server at {args.base_url} must be using it")
+
+    results: Dict[str, Any] = {}
+    try:
+        async with app.router.lifespan_context(app) if args.base_url is None else nullcontext():
+            if args.base_url is None:
+                await _wait_for_search_index()
+            for scenario in selected:
+                results[scenario.name] = result = await run_scenario(
+                    scenario, fixture, counter, args.concurrency, args.duration, args.warmup, args.base_url
+                )
+                print(
+                    f"{scenario.name:>14}: {result['throughput_rps']:8.1f} req/s "
+                    f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                    f"mongo={_round_trips(result['mongo_round_trips_per_request'])}/req errors={result['errors']}"
+                )
+    finally:
+        if not args.keep:
+            client = AsyncMongoClient(settings.MONGODB_URI)
+            await client.drop_database(database)
+            await client.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "schools": len(fixture.school_ids),
+            "users": len(fixture.usernames),
+            "sessions": len(fixture.viewer_tokens) + len(fixture.staff_tokens),
+            "concurrency": args.concurrency,
+            "base_url": args.base_url,
+            "duration_s": args.duration,
+            "settings": {
+                key: value for key, value in settings.model_dump().items() if key.startswith(SETTINGS_PREFIXES)
+            },
+        },
+        "scenarios": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"results written to {output}")
+
+    if args.compare:
+        _print_comparison(results, Path(args.compare))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent request loops per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per scenario")
+    parser.add_argument("--scenarios", help=f"comma-separated subset of: {','.join(s.name for s in SCENARIOS)}")
+    parser.add_argument("--database", help="database to seed and run against (dropped before and after)")
+    parser.add_argument("--no-seed", action="store_true", help="run against an already seeded --database (see --keep)")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database afterwards")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to print deltas against")
+    parser.add_argument("--base-url", help="drive a running server over HTTP instead of the app in-process")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""Latency of GET /schools while logins run concurrently.
+
+Drives app.main:app in-process over an httpx ASGI transport against the
+database configured in backend/.env. Run from backend/:
+
+    python -m benchmarks.login_contention --logins 16 --duration 10
+    PASSWORD_HASH_WORKERS=0 python -m benchmarks.login_contention   # bcrypt on the event loop, for comparison
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import password_hashing_stats
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.main import app
+from app.models.session import SessionDoc
+from app.models.user import UserDoc
+from app.schemas.user import UserAdd
+from app.services.user import add_user
+
+BENCH_USER = "bench-login"
+BENCH_PASSWORD = "bench-login-password"
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def _login_loop(client: httpx.AsyncClient, deadline: float, counts: dict):
+    while time.perf_counter() < deadline:
+        response = await client.post("/auth/login", json={"username": BENCH_USER, "password": BENCH_PASSWORD})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def _read_loop(client: httpx.AsyncClient, deadline: float, latencies: list[float]):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/schools", params={"limit": 50})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def _delete_bench_user():
+    # Every login above opened a session; drop them along with the user.
+    async for user in UserDoc.find(UserDoc.username == BENCH_USER):
+        await SessionDoc.find(SessionDoc.userId == user.id).delete()
+        await user.delete()
+
+
+async def main(logins: int, readers: int, duration: float):
+    await connect_to_mongo()
+    await _delete_bench_user()
+    await add_user(UserAdd(username=BENCH_USER, email="bench-login@example.com", password=BENCH_PASSWORD, role="staff"))
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/auth/login", json={"username": BENCH_USER, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            client.cookies.set(settings.SESSION_COOKIE_NAME, response.json()["token"])
+
+            for label, login_workers in (("idle", 0), ("contended", logins)):
+                latencies: list[float] = []
+                login_counts: dict[int, int] = {}
+                deadline = time.perf_counter() + duration
+                await asyncio.gather(
+                    *(_read_loop(client, deadline, latencies) for _ in range(readers)),
+                    *(_login_loop(client, deadline, login_counts) for _ in range(login_workers)),
+                )
+                print(
+                    f"{label:>10}: GET /schools n={len(latencies)} "
+                    f"p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+                    f"p99={percentile(latencies, 99):.1f}ms logins={login_counts}"
+                )
+            print(f"hash pool: {password_hashing_stats()}")
+    finally:
+        await _delete_bench_user()
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login loops")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent GET /schools loops")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.readers, args.duration))
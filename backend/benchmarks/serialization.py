@@ -0,0 +1,110 @@
+"""Throughput and peak allocations of the school list serialisation paths.
+
+Raw documents come from benchmarks.datagen, in the shape the driver returns
+them; the database in backend/.env is only used to initialise Beanie, which
+the model path needs. Run from backend/:
+
+    python -m benchmarks.serialization --schools 10000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.models.school import School
+from app.schemas.school import SchoolOut
+from app.services.school_serialization import SCHOOL_FIELD_PRESETS, SCHOOL_FIELDS, SchoolFieldSet, dump_json, dump_schools
+from benchmarks.datagen import school_docs
+
+
+_COUNT_FIELDS = {field for field in SchoolOut.model_fields if field not in SCHOOL_FIELDS.stored + SCHOOL_FIELDS.activity + ("id",)}
+
+
+def _project(doc: Dict[str, Any], fields: SchoolFieldSet = SCHOOL_FIELDS) -> Dict[str, Any]:
+    # What Mongo sends back for `fields.projection`.
+    out: Dict[str, Any] = {"_id": doc["_id"]}
+    for path in fields.projection:
+        if "." in path:
+            parent, child = path.split(".", 1)
+            out.setdefault(parent, {})[child] = doc[parent][child]
+        elif path in doc:
+            out[path] = doc[path]
+    return out
+
+
+def model_path(docs: List[Dict[str, Any]]) -> bytes:
+    # Beanie decode -> model_dump -> SchoolOut -> jsonable_encoder -> json.dumps,
+    # as list_schools and FastAPI's default JSONResponse did it.
+    schools = [School.model_validate(doc) for doc in docs]
+    school_list = [SchoolOut(**school.model_dump(), qrScans=[], accessLogs=[]) for school in schools]
+    # Lists leave the activity counts out unless asked for; match the raw path's fields.
+    content = {"schools": [jsonable_encoder(school, exclude=_COUNT_FIELDS) for school in school_list], "total": len(school_list)}
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def raw_path(docs: List[Dict[str, Any]], fields: SchoolFieldSet = SCHOOL_FIELDS) -> bytes:
+    school_list = dump_schools(docs, fields)
+    return dump_json({"schools": school_list, "total": len(school_list)})
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], bytes], docs: List[Dict[str, Any]], rounds: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = fn(docs)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(docs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "best_ms": best * 1000,
+        "docs_per_s": len(docs) / best,
+        "peak_mib": peak / 2**20,
+        "body_kib": len(body) / 1024,
+    }
+
+
+async def main(schools: int, rounds: int):
+    await connect_to_mongo()
+    try:
+        run(schools, rounds)
+    finally:
+        await close_mongo_connection()
+
+
+def run(schools: int, rounds: int):
+    generated = list(school_docs(schools))
+    full_docs = [{**doc, "revision_id": None} for doc in generated]
+    projected = [_project(doc) for doc in generated]
+
+    results = {
+        "model (full docs)": measure(model_path, full_docs, rounds),
+        "raw (projected docs)": measure(raw_path, projected, rounds),
+    }
+    for name, fields in SCHOOL_FIELD_PRESETS.items():
+        sparse = [_project(doc, fields) for doc in generated]
+        results[f"raw (fields={name})"] = measure(lambda docs, fields=fields: raw_path(docs, fields), sparse, rounds)
+    for label, result in results.items():
+        print(
+            f"{label:>22}: {result['best_ms']:8.1f}ms {result['docs_per_s']:10.0f} docs/s "
+            f"peak={result['peak_mib']:6.1f}MiB body={result['body_kib']:.0f}KiB"
+        )
+    baseline, fast = results["model (full docs)"], results["raw (projected docs)"]
+    print(f"speed-up: {baseline['best_ms'] / fast['best_ms']:.1f}x, peak memory: {fast['peak_mib'] / baseline['peak_mib']:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.schools, args.rounds))
@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time; the tests never connect.
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGODB_DB_NAME", "looma_test")
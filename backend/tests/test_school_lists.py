@@ -0,0 +1,55 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.models.school import School
+from app.services import schools
+from app.services.school_serialization import parse_school_fields
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return FakeCursor([dict(doc) for doc in self.docs])
+
+
+def _patch_schools(monkeypatch, docs):
+    monkeypatch.setattr(School, "get_pymongo_collection", classmethod(lambda cls: None))
+    monkeypatch.setattr(schools, "routed_reads", lambda collection: FakeCollection(docs))
+
+
+def test_default_list_does_not_count_activity(monkeypatch):
+    _patch_schools(monkeypatch, [{"_id": ObjectId(), "name": "A", "status": "online"}])
+
+    async def no_counts(school_ids=None):
+        raise AssertionError("school_activity_counts called for a default list")
+
+    monkeypatch.setattr(schools, "school_activity_counts", no_counts)
+    school_list = asyncio.run(schools.list_schools())
+    assert [school["name"] for school in school_list] == ["A"]
+    assert "qrScanCount" not in school_list[0]
+
+
+def test_list_counts_activity_when_asked(monkeypatch):
+    school_id = ObjectId()
+    _patch_schools(monkeypatch, [{"_id": school_id, "name": "A", "status": "online"}])
+    calls = []
+
+    async def counts(school_ids=None):
+        calls.append(school_ids)
+        return {school_id: {"qrScanCount": 2, "accessLogCount": 1}}
+
+    monkeypatch.setattr(schools, "school_activity_counts", counts)
+    assert asyncio.run(schools.list_schools(activity=True))[0]["qrScanCount"] == 2
+    assert asyncio.run(schools.list_schools(fields=parse_school_fields("name,accessLogCount")))[0]["accessLogCount"] == 1
+    assert len(calls) == 2
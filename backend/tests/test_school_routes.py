@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from app.api.routes import schools as routes
+from app.schemas.school import SchoolSort
+
+
+def _request(headers=None, query=b""):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/schools", "headers": raw, "query_string": query})
+
+
+def _get_schools(request, **params):
+    args = dict(
+        stats=False, province=None, search=None, limit=None, cursor=None, sort=SchoolSort.NAME,
+        include_total=False, stream=False, activity=False, fields=None,
+    )
+    return asyncio.run(routes.get_schools(request, **{**args, **params}))
+
+
+def test_stats_are_never_streamed(monkeypatch):
+    async def version():
+        return 1
+
+    async def stats():
+        return {"total": 3}
+
+    def no_stream(*args, **kwargs):
+        raise AssertionError("stats request was streamed")
+
+    monkeypatch.setattr(routes, "get_school_version", version)
+    monkeypatch.setattr(routes, "get_school_stats", stats)
+    monkeypatch.setattr(routes, "iter_schools", no_stream)
+    monkeypatch.setattr(routes.school_snapshots, "max_bytes", 0)
+
+    response = _get_schools(_request(query=b"stats=true&stream=true"), stats=True, stream=True)
+    assert json.loads(response.body) == {"total": 3}
+    response = _get_schools(_request({"Accept": routes.NDJSON_MEDIA_TYPE}, b"stats=true"), stats=True)
+    assert json.loads(response.body) == {"total": 3}